@@ -0,0 +1,110 @@
+# analyzer/_proc_linux.py
+"""
+Coleta de processos direto do /proc (somente Linux), usada pelo SystemMonitor:
+- enumera os PIDs com os.scandir("/proc") (sem criar psutil.Process por processo)
+- uma única leitura de /proc/[pid]/stat por PID (open relativo ao fd de /proc + readv num buffer reutilizado): nome, ticks de CPU, início e RSS
+- HostStat: CPU/RAM do sistema com /proc/stat e /proc/meminfo mantidos abertos
+"""
+
+import os
+from typing import List, Optional, Tuple
+
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+TOTAL_MEM = PAGE_SIZE * os.sysconf("SC_PHYS_PAGES")
+
+# (pid, name, utime+stime ticks, starttime ticks, rss pages)
+ProcStat = Tuple[int, str, int, int, int]
+
+def parse_stat(pid: int, data, end: Optional[int] = None) -> Optional[ProcStat]:
+    # data may be bytes or a reused bytearray holding `end` valid bytes
+    if end is None:
+        end = len(data)
+    # comm may contain spaces or parens: it runs from the first "(" to the last ")"
+    rp = data.rfind(b")", 0, end)
+    lp = data.find(b"(", 0, rp)
+    if lp == -1 or rp == -1:
+        return None
+    fields = data[rp + 2:end].split(b" ", 22)
+    # fields[0] is stat field 3 (state): utime=14, stime=15, starttime=22, rss=24
+    try:
+        return (pid, data[lp + 1:rp].decode("utf-8", "replace"),
+                int(fields[11]) + int(fields[12]), int(fields[19]), int(fields[21]))
+    except (IndexError, ValueError):
+        return None
+
+# /proc/[pid]/stat is a few hundred bytes (comm is capped at 64)
+STAT_BUF_SIZE = 4096
+
+def collect() -> List[ProcStat]:
+    out: List[ProcStat] = []
+    # per call: the directory fd carries the listing's read offset, so concurrent scans must
+    # not share one; per-PID stat files are opened relative to it (no path walk from /)
+    dirfd = os.open("/proc", os.O_RDONLY | os.O_DIRECTORY)
+    # one buffer per scan, reused for every PID
+    buf = bytearray(STAT_BUF_SIZE)
+    bufs = [buf]
+    try:
+        with os.scandir(dirfd) as it:
+            for entry in it:
+                name = entry.name
+                if not name.isdigit():
+                    continue
+                try:
+                    fd = os.open(f"{name}/stat", os.O_RDONLY, dir_fd=dirfd)
+                except OSError:
+                    # process exited between the listing and the open
+                    continue
+                try:
+                    n = os.readv(fd, bufs)
+                except OSError:
+                    continue
+                finally:
+                    os.close(fd)
+                st = parse_stat(int(name), buf, n)
+                if st is not None:
+                    out.append(st)
+    finally:
+        os.close(dirfd)
+    return out
+
+class HostStat:
+    """CPU e RAM do sistema via /proc/stat e /proc/meminfo, abertos uma vez (cada leitura = seek + read)."""
+
+    def __init__(self):
+        self._stat = open("/proc/stat", "rb", buffering=0)
+        self._meminfo = open("/proc/meminfo", "rb", buffering=0)
+        # baseline for the first cpu_percent() delta
+        self._prev = self._cpu_times()
+
+    def _cpu_times(self) -> Tuple[int, int]:
+        self._stat.seek(0)
+        line = self._stat.read(1024).split(b"\n", 1)[0]
+        # cpu user nice system idle iowait irq softirq steal [guest guest_nice]
+        # guest time is already inside user/nice, so only the first 8 count
+        f = [int(x) for x in line.split()[1:9]]
+        return sum(f), f[3] + f[4]
+
+    def cpu_percent(self) -> float:
+        # same definition as psutil.cpu_percent(interval=None): busy share since the last call
+        total, idle = self._cpu_times()
+        prev_total, prev_idle = self._prev
+        self._prev = (total, idle)
+        delta = total - prev_total
+        if delta <= 0:
+            return 0.0
+        return round(100.0 * (delta - (idle - prev_idle)) / delta, 1)
+
+    def mem_percent(self) -> float:
+        # psutil.virtual_memory().percent: (total - available) / total
+        self._meminfo.seek(0)
+        total = avail = None
+        for line in self._meminfo.read(8192).split(b"\n"):
+            if line.startswith(b"MemTotal:"):
+                total = int(line.split()[1])
+            elif line.startswith(b"MemAvailable:"):
+                avail = int(line.split()[1])
+                break
+        if not total or avail is None:
+            return 0.0
+        return round(100.0 * (total - avail) / total, 1)
@@ -5,28 +5,46 @@ Analyzer v5 - Main (Avançado, integrado)
 - Usa ModelBackend (Ollama qwen2.5 quantizado)
 - Integra SystemMonitor via queue
 - Thinking label separado da conversa (não insere "pensando" no chat)
+- Resposta exibida em streaming (tokens inseridos conforme chegam)
 - Export/Import, Retry, Clean, Settings dialog integrated
 """
 
 import tkinter as tk
 from tkinter import scrolledtext, messagebox, filedialog
 import tkinter.font as tkfont
-import queue
-import threading
+import collections
+import copy
+import hashlib
+import itertools
 import time
 import json
 import os
+import uuid
 import logging
-from typing import Optional
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, Dict, List, Tuple
+
+try:
+    import orjson  # optional: faster settings parse/dump
+except ImportError:
+    orjson = None
 
 # imports for backend + monitor
-from model_backend import ModelBackend
-from monitor import SystemMonitor
+from model_backend import ModelBackend, INITIAL_GREETING
+from monitor import get_monitor
+from utils import run_in_thread, run_daemon
 
 # logging file
 LOG_DIR = os.path.join(os.path.dirname(__file__), "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
-logging.basicConfig(filename=os.path.join(LOG_DIR,"analyzer_gui.log"), level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+# records only get enqueued on the calling (GUI) thread; LOG_LISTENER does the file I/O
+_log_queue = queue.SimpleQueue()
+_log_file = RotatingFileHandler(os.path.join(LOG_DIR,"analyzer_gui.log"), maxBytes=2_000_000, backupCount=3, encoding="utf-8")
+_log_file.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(message)s"))
+LOG_LISTENER = QueueListener(_log_queue, _log_file)
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)])
 logger = logging.getLogger("AnalyzerGUI")
 logger.setLevel(logging.INFO)
 
@@ -38,32 +56,61 @@ ANALYZER_COLOR = "#7CFF6B"
 META_COLOR = "#9AA5B1"
 FONT_NAME = "Consolas"
 FONT_SIZE = 11
+THINKING_FRAMES = tuple(f"Analyzer está pensando{d}" for d in ("", ".", "..", "..."))
+# chat widget keeps at most this many lines; older ones are trimmed (export uses _chat_log)
+MAX_CHAT_LINES = 4000
+# monitor top_procs entries always carry these keys (psutil process_iter attrs)
+PROC_LINE_FMT = "PID {pid} - {name} CPU% {cpu_percent} MEM% {memory_percent}\n".format_map
 
 SETTINGS_PATH = os.path.join(os.path.dirname(__file__), "analyzer_setting.json")
+DEFAULT_SETTINGS = {
+    "diagnostic_mode": {"autonomy": "B2", "auto_scan_interval": 8},
+}
+
+# digest of the settings last read from / written to disk; save_settings skips no-op writes
+_settings_digest: Optional[str] = None
+
+def _digest_settings(data: dict) -> str:
+    canon = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(canon.encode("utf-8"), digest_size=16).hexdigest()
 
 # util to load settings
 def load_settings() -> dict:
+    global _settings_digest
     if os.path.exists(SETTINGS_PATH):
         try:
-            with open(SETTINGS_PATH,"r",encoding="utf-8") as f:
-                return json.load(f)
+            if orjson is not None:
+                with open(SETTINGS_PATH,"rb") as f:
+                    data = orjson.loads(f.read())
+            else:
+                with open(SETTINGS_PATH,"r",encoding="utf-8") as f:
+                    data = json.load(f)
         except Exception:
             return {}
+        _settings_digest = _digest_settings(data)
+        return data
     return {}
 
 def save_settings(data: dict):
+    global _settings_digest
+    digest = _digest_settings(data)
+    if digest == _settings_digest:
+        return
+    # write to a temp file then rename, so a crash never leaves a half-written settings file
+    tmp = SETTINGS_PATH + ".tmp"
     try:
-        with open(SETTINGS_PATH,"w",encoding="utf-8") as f:
-            json.dump(data,f,ensure_ascii=False, indent=2)
+        # serialize up front so the file gets one write instead of json.dump's many small ones
+        if orjson is not None:
+            payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        else:
+            payload = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+        with open(tmp,"wb") as f:
+            f.write(payload)
+        os.replace(tmp, SETTINGS_PATH)
+        _settings_digest = digest
     except Exception as e:
         logger.warning(f"save_settings failed: {e}")
 
-# thread helper
-def run_in_thread(fn, daemon=True):
-    t = threading.Thread(target=fn, daemon=daemon)
-    t.start()
-    return t
-
 class AnalyzerApp:
     def __init__(self, root):
         self.root = root
@@ -72,50 +119,88 @@ class AnalyzerApp:
         self.root.geometry("1100x720")
         self.root.minsize(780,480)
 
-        # settings
-        self.settings = load_settings()
-        # create default settings if missing
-        if not self.settings:
-            try:
-                with open(SETTINGS_PATH,"r",encoding="utf-8") as f:
-                    self.settings = json.load(f)
-            except Exception:
-                self.settings = {}
-
-        self._q = queue.Queue()
+        # settings (in-memory defaults if the file is missing/unreadable)
+        self.settings = load_settings() or copy.deepcopy(DEFAULT_SETTINGS)
+        # live-reload bookkeeping (see _current_settings)
+        self._settings_checked = time.monotonic()
+        self._settings_mtime = self._stat_settings()
+
+        # GUI transport: deque append/popleft are atomic under the GIL, no Queue mutex per event
+        self._q = collections.deque()
+        # bounded pool for exports and blocking monitor actions (cleanup, kill)
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="analyzer")
+        self._inflight: Dict[str, Future] = {}
         # backend
         model_name = self.settings.get("model_name")
         host = self.settings.get("host")
-        self.backend = ModelBackend(provider="ollama", model_name=model_name, host=host)
-        self.backend.initialize = getattr(self.backend, "initialize", lambda: None)
-        # monitor (pass queue so monitor can emit events)
-        self.monitor = SystemMonitor(queue=self._q, interval=self.settings.get("diagnostic_mode", {}).get("auto_scan_interval", 8))
-        run_in_thread(self.monitor.start_monitoring)
+        # None -> model_backend.PROVIDER (analyzer_settings.json)
+        self.backend = ModelBackend(provider=self.settings.get("provider"), model_name=model_name, host=host)
+        # monitor (pass queue so monitor can emit events); autonomy "off" never builds it
+        diag = self.settings.get("diagnostic_mode", {})
+        self.monitor = None
+        if diag.get("autonomy", "B2") != "off":
+            self.monitor = get_monitor(queue=self._q, interval=diag.get("auto_scan_interval", 8), notify=self._notify_queue)
 
         # UI state
         self._thinking = False
         self._thinking_job = None
-        self._dots = 0
+        self._dot_cycle = itertools.cycle(THINKING_FRAMES)
         self._last_user_prompt: Optional[str] = None
+        # set once the backend warmup finished (or timed out); see _prefetch_startup
+        self._ready = False
+        self._queued_prompt: Optional[str] = None
+        # id of the generate_stream whose tokens are shown; stale ids are dropped in _process_queue
+        self._current_req_id: Optional[str] = None
         self._last_response: Optional[str] = None
+        # chat lines waiting to be rendered (header, text, tag); drained by _flush_chat
+        self._pending_lines: List[Tuple[str, str, str]] = []
+        self._flush_job = None
+        # pre-formatted "header + text" entries backing on_export after the widget is trimmed
+        self._chat_log = collections.deque(maxlen=MAX_CHAT_LINES)
+        # streamed reply state: bubble body lives between the stream_start/stream_end marks
+        self._streaming = False
+        self._stream_text: List[str] = []
+        self._stream_ts = ""
+        self._last_token_ts = 0.0
 
         # fonts
         self.base_font = tkfont.Font(family=FONT_NAME, size=FONT_SIZE)
         self.small_font = tkfont.Font(family=FONT_NAME, size=max(9, FONT_SIZE-2))
-        self.italic_font = tkfont.Font(family=FONT_NAME, size=FONT_SIZE, slant="italic")
+        # italic font only backs the "thinking" tag; created on first use (_ensure_italic_font)
+        self.italic_font = None
+        # header timestamp cache (second resolution)
+        self._ts_sec = -1
+        self._ts_cache = ""
+        self._header_fmt = "[{ts}] {who}:\n".format
 
         self._build_ui()
-        # initial greeting from backend
-        try:
-            g = self.backend.initial_assistant_greeting()
-        except Exception:
-            g = "Olá, meu nome é Analyzer. Sou uma IA projetada para conversar naturalmente. O que deseja saber hoje?"
-        self._append_chat("Analyzer", g, "analyzer")
 
-        # poll queue
-        self.root.after(150, self._process_queue)
+        # queue is drained on <<QueueMsg>> (fired by producers); the timer is only a safety net
+        self.root.bind("<<QueueMsg>>", self._process_queue)
+        self.root.after(1000, self._queue_watchdog)
+
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # greeting is static: render it now; backend init runs in background
+        self._append_chat("Analyzer", INITIAL_GREETING, "analyzer")
+        self.status_var.set("Inicializando...")
+        run_in_thread(self._prefetch_startup)
         logger.info("AnalyzerApp initialized")
 
+    def _prefetch_startup(self):
+        try:
+            # records the greeting in the backend history (already shown by __init__)
+            self.backend.initial_assistant_greeting()
+        except Exception:
+            logger.exception("startup prefetch error")
+        self._post("status", "Inicializando modelo...")
+        try:
+            # bounded wait: an unreachable Ollama must not hold the first prompt forever
+            self.backend.initialize(timeout=15)
+        except Exception:
+            logger.exception("backend initialize error")
+        self._post("ready", None)
+
     def _build_ui(self):
         top = tk.Frame(self.root, bg=BG)
         top.pack(fill=tk.BOTH, expand=True, padx=12, pady=10)
@@ -127,12 +212,6 @@ class AnalyzerApp:
         self.chat_display.tag_config("user", foreground=USER_COLOR, justify="right", font=self.base_font)
         self.chat_display.tag_config("analyzer", foreground=ANALYZER_COLOR, justify="left", font=self.base_font)
         self.chat_display.tag_config("meta", foreground=META_COLOR, justify="center", font=self.small_font)
-        # thinking tag defined but we won't insert thinking into chat
-        try:
-            self.chat_display.tag_config("thinking", foreground="#888888", justify="left", font=self.italic_font)
-        except Exception:
-            # older tkinter may reject font tuple; ignore
-            pass
 
         bottom = tk.Frame(self.root, bg=BG)
         bottom.pack(fill=tk.X, padx=12, pady=(0,12))
@@ -161,15 +240,43 @@ class AnalyzerApp:
         status = tk.Label(self.root, textvariable=self.status_var, bg=BG, fg=META_COLOR, anchor="w")
         status.pack(side=tk.BOTTOM, fill=tk.X)
 
+    def _timestamp(self) -> str:
+        now = int(time.time())
+        if now != self._ts_sec:
+            self._ts_sec = now
+            self._ts_cache = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+        return self._ts_cache
+
     def _append_chat(self, who: str, text: str, tag: str):
+        # only queue the line; rendering is coalesced in _flush_chat
+        header = self._header_fmt(ts=self._timestamp(), who=who)
+        self._chat_log.append(header + text + "\n\n")
+        self._pending_lines.append((header, text, tag))
+        if self._flush_job is None:
+            self._flush_job = self.root.after(50, self._flush_chat)
+        logger.info(f"{who}: {text[:300]}")
+
+    def _flush_chat(self):
+        self._flush_job = None
+        if not self._pending_lines:
+            return
+        lines, self._pending_lines = self._pending_lines, []
+        # single insert with alternating text/tag segments -> one relayout per burst
+        segments = []
+        for header, text, tag in lines:
+            segments.extend((header, "meta", text + "\n\n", tag))
         self.chat_display.configure(state=tk.NORMAL)
-        ts = time.strftime("%Y-%m-%d %H:%M:%S")
-        header = f"[{ts}] {who}:\n"
-        self.chat_display.insert(tk.END, header, "meta")
-        self.chat_display.insert(tk.END, text + "\n\n", tag)
+        self.chat_display.insert(tk.END, *segments)
+        self._trim_chat()
         self.chat_display.configure(state=tk.DISABLED)
         self.chat_display.yview(tk.END)
-        logger.info(f"{who}: {text[:300]}")
+
+    def _trim_chat(self):
+        # caller holds the widget in NORMAL state
+        lines = int(self.chat_display.index("end-1c").split(".")[0])
+        if lines > MAX_CHAT_LINES:
+            excess = lines - MAX_CHAT_LINES
+            self.chat_display.delete("1.0", f"{excess + 1}.0")
 
     # actions
     def on_send(self):
@@ -177,11 +284,31 @@ class AnalyzerApp:
         if not prompt:
             return
         self._last_user_prompt = prompt
+        # a new prompt supersedes whatever is still streaming
+        self._cancel_current()
         self._append_chat("Você", prompt, "user")
         self.input_var.set("")
-        self.status_var.set("Gerando...")
         self._start_thinking()
-        run_in_thread(lambda: self._worker_generate(prompt))
+        if not self._ready:
+            # model still warming up: hold the latest prompt, dispatched on "ready"
+            self._queued_prompt = prompt
+            self.status_var.set("Aguardando modelo...")
+            return
+        self._dispatch(prompt)
+
+    def _dispatch(self, prompt: str):
+        req_id = self._current_req_id = uuid.uuid4().hex
+        self.status_var.set("Gerando...")
+        # daemon thread, not the pool: a stream stuck in prefill must not block exit after on_close
+        run_daemon(self._worker_generate, prompt, req_id)
+
+    def _cancel_current(self):
+        if self._current_req_id is not None:
+            self.backend.cancel(self._current_req_id)
+            self._current_req_id = None
+        if self._streaming:
+            # close the partial bubble as-is
+            self._finish_stream("".join(self._stream_text))
 
     def on_retry(self):
         if not self._last_user_prompt:
@@ -191,19 +318,40 @@ class AnalyzerApp:
         self.on_send()
 
     def on_export(self):
-        text = self.chat_display.get("1.0", tk.END).strip()
+        text = "".join(self._chat_log).strip()
         if not text:
             messagebox.showinfo("Exportar", "Nada para exportar.")
             return
         filename = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text files","*.txt")])
         if filename:
+            self.status_var.set("Exportando...")
+            self._pool.submit(self._worker_export, filename, text)
+
+    def _worker_export(self, filename: str, text: str):
+        # file I/O off the Tk thread; result comes back through the queue
+        try:
+            # text mode on purpose: the transcript keeps the platform's line endings (\r\n on Windows)
             with open(filename,"w",encoding="utf-8") as f:
                 f.write(text)
-            messagebox.showinfo("Exportar", f"Conversa salva em:\n{filename}")
+        except Exception as e:
+            logger.exception("export error")
+            self._post("error", f"Falha ao exportar: {e}")
+            self._post("status", "Pronto")
+            return
+        self._post("status", "Exportado")
+        self._post("info", ("Exportar", f"Conversa salva em:\n{filename}"))
 
     def on_clear(self):
         if not messagebox.askyesno("Limpar", "Deseja limpar todo o histórico de chat?"):
             return
+        self._cancel_current()
+        # the superseded worker no longer posts "Pronto" for us
+        self._stop_thinking()
+        self._queued_prompt = None
+        self._pending_lines = []
+        self._chat_log.clear()
+        self._streaming = False
+        self._stream_text = []
         self.chat_display.configure(state=tk.NORMAL)
         self.chat_display.delete("1.0", tk.END)
         self.chat_display.configure(state=tk.DISABLED)
@@ -212,92 +360,261 @@ class AnalyzerApp:
         self._last_response = None
         self.status_var.set("Pronto")
 
+    def on_close(self):
+        self._cancel_current()
+        if self.monitor is not None:
+            self.monitor.stop()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.backend.close()
+        self.root.destroy()
+
     # worker
-    def _worker_generate(self, prompt: str):
+    def _worker_generate(self, prompt: str, req_id: str):
         try:
-            resp = self.backend.generate(prompt)
-            self._last_response = resp
-            self._q.put(("message", resp))
+            # the final reply is the generator's return value: per request, never shared state
+            stream = self.backend.generate_stream(prompt, request_id=req_id)
+            while True:
+                try:
+                    chunk = next(stream)
+                except StopIteration as done:
+                    resp = done.value or ""
+                    break
+                self._post("token", (req_id, chunk))
+            if req_id == self._current_req_id:
+                self._last_response = resp
+            self._post("message_done", (req_id, resp))
         except Exception as e:
             logger.exception("worker_generate error")
-            self._q.put(("error", str(e)))
+            self._post("error", str(e))
         finally:
-            self._q.put(("status", "Pronto"))
+            # a superseded worker must not reset the status of the current one
+            if req_id == self._current_req_id:
+                self._post("status", "Pronto")
+
+    # streaming bubble
+    def _begin_stream(self):
+        # keep ordering with lines still waiting in the batch
+        self._flush_chat()
+        self._stream_ts = self._timestamp()
+        self.chat_display.configure(state=tk.NORMAL)
+        self.chat_display.insert(tk.END, self._header_fmt(ts=self._stream_ts, who="Analyzer"), "meta", "\n\n", "analyzer")
+        self.chat_display.configure(state=tk.DISABLED)
+        # body goes right before the trailing blank line
+        pos = self.chat_display.index("end-3c")
+        self.chat_display.mark_set("stream_start", pos)
+        self.chat_display.mark_gravity("stream_start", tk.LEFT)
+        self.chat_display.mark_set("stream_end", pos)
+        self.chat_display.mark_gravity("stream_end", tk.RIGHT)
+        self._streaming = True
+        self._stream_text = []
+
+    def _append_stream(self, chunk: str):
+        if not self._streaming:
+            self._begin_stream()
+        self._stream_text.append(chunk)
+        self._last_token_ts = time.monotonic()
+        self.chat_display.configure(state=tk.NORMAL)
+        self.chat_display.insert("stream_end", chunk, "analyzer")
+        self.chat_display.configure(state=tk.DISABLED)
+        self.chat_display.yview(tk.END)
 
-    # queue processing (including monitor events)
-    def _process_queue(self):
+    def _finish_stream(self, final: str):
+        self._stop_thinking()
+        if not self._streaming:
+            if final:
+                self._append_chat("Analyzer", final, "analyzer")
+            return
+        self._streaming = False
+        # post-processing may have trimmed the reply; show the final version
+        self.chat_display.configure(state=tk.NORMAL)
+        if final and final != "".join(self._stream_text):
+            self.chat_display.delete("stream_start", "stream_end")
+            self.chat_display.insert("stream_start", final, "analyzer")
+        self._trim_chat()
+        self.chat_display.configure(state=tk.DISABLED)
+        self._chat_log.append(self._header_fmt(ts=self._stream_ts, who="Analyzer") + final + "\n\n")
+        self._stream_text = []
+        logger.info(f"Analyzer: {final[:300]}")
+
+    # settings live-reload: stat at most every 5 s, re-parse only when the file changed
+    def _stat_settings(self) -> Optional[float]:
         try:
-            while True:
-                typ, payload = self._q.get_nowait()
-                if typ == "status":
-                    self.status_var.set(payload)
-                    if payload == "Pronto":
-                        self._stop_thinking()
-                elif typ == "message":
-                    self._append_chat("Analyzer", payload, "analyzer")
-                elif typ == "error":
-                    self._append_chat("Analyzer (erro)", payload, "meta")
-                elif typ == "monitor_alert":
-                    # payload contains cpu/mem/disk/top_procs
-                    detail = payload
-                    summary = f"Alerta: CPU {detail['cpu']}% | RAM {detail['mem']}% | DISCO {detail['disk']}%\nTop processos:\n"
-                    for p in detail.get("top_procs", [])[:3]:
-                        summary += f"PID {p.get('pid')} - {p.get('name')} CPU% {p.get('cpu_percent')} MEM% {p.get('memory_percent')}\n"
-                    # show in chat and also popup
-                    self._append_chat("Analyzer (Monitor)", summary, "meta")
-                    # if autonomy is not B3 ask user to act (monitor may auto-act depending on settings)
-                    settings = load_settings()
-                    autonomy = settings.get("diagnostic_mode", {}).get("autonomy", "B2")
-                    if autonomy != "B3":
-                        def ask_handle():
-                            ans = messagebox.askyesno("Monitor", summary + "\nDeseja encerrar o processo mais pesado?")
-                            if ans:
-                                top = detail.get("top_procs",[])
-                                if top:
-                                    pid = top[0].get("pid")
-                                    ok, msg = SystemMonitor.kill_process(self.monitor, pid) if hasattr(SystemMonitor, "kill_process") else (False,"kill fn not available")
-                                    self._append_chat("Analyzer (Monitor)", f"Ação: {msg}", "meta")
-                        self.root.after(50, ask_handle)
-                elif typ == "monitor_suggest":
-                    detail = payload
-                    suggestion = f"Sugestão: {detail.get('suggest')} (disk {detail.get('disk')}%)"
-                    self._append_chat("Analyzer (Monitor)", suggestion, "meta")
-                    # ask user for cleaning
-                    def ask_clean():
-                        ans = messagebox.askyesno("Monitor - Sugestão", suggestion + "\nDeseja limpar temporários?")
-                        if ans:
-                            res = SystemMonitor.clean_temp_folder(None)
-                            removed = len(res.get("removed", []))
-                            failed = len(res.get("failed", []))
-                            self._append_chat("Analyzer (Monitor)", f"Limpeza concluída. Removidos: {removed}, Falhas: {failed}", "meta")
-                    self.root.after(50, ask_clean)
-                elif typ == "monitor_action":
-                    act = payload
-                    self._append_chat("Analyzer (Monitor)", f"Ação executada: {act}", "meta")
-                elif typ == "monitor_log":
-                    msg = payload.get("msg") if isinstance(payload, dict) else str(payload)
-                    self._append_chat("Analyzer (Monitor)", msg, "meta")
-        except queue.Empty:
+            return os.stat(SETTINGS_PATH).st_mtime
+        except OSError:
+            return None
+
+    def _current_settings(self) -> dict:
+        now = time.monotonic()
+        if now - self._settings_checked >= 5.0:
+            self._settings_checked = now
+            mtime = self._stat_settings()
+            if mtime != self._settings_mtime:
+                self._settings_mtime = mtime
+                self.settings = load_settings() or self.settings
+        return self.settings
+
+    # queue transport (thread-safe: workers and monitor call _post/_notify_queue)
+    def _post(self, typ: str, payload):
+        self._q.append((typ, payload))
+        self._notify_queue()
+
+    def _notify_queue(self):
+        try:
+            self.root.event_generate("<<QueueMsg>>", when="tail")
+        except (tk.TclError, RuntimeError):
+            # window closing / mainloop not running; watchdog will drain
             pass
-        finally:
-            self.root.after(150, self._process_queue)
+
+    def _queue_watchdog(self):
+        self._process_queue()
+        self.root.after(1000, self._queue_watchdog)
+
+    # queue processing (including monitor events)
+    def _process_queue(self, event=None):
+        # monitor bursts are coalesced: one alert and one log block per drain
+        latest_alert = None
+        monitor_logs: List[str] = []
+        # single consumer: deque truthiness is a safe loop guard, no exception on the hot path
+        # streamed tokens of one drain go into the widget with a single insert
+        token_buf: List[str] = []
+        while self._q:
+            typ, payload = self._q.popleft()
+            if typ == "token":
+                req_id, chunk = payload
+                if req_id == self._current_req_id:
+                    token_buf.append(chunk)
+                continue
+            if token_buf:
+                self._append_stream("".join(token_buf))
+                token_buf = []
+            if typ == "status":
+                self.status_var.set(payload)
+                if payload == "Pronto":
+                    self._stop_thinking()
+            elif typ == "message_done":
+                req_id, final = payload
+                if req_id == self._current_req_id:
+                    self._finish_stream(final)
+            elif typ == "ready":
+                self._ready = True
+                if self._queued_prompt is not None:
+                    prompt, self._queued_prompt = self._queued_prompt, None
+                    self._dispatch(prompt)
+                else:
+                    self.status_var.set("Pronto")
+            elif typ == "info":
+                title, msg = payload
+                messagebox.showinfo(title, msg)
+            elif typ == "error":
+                self._append_chat("Analyzer (erro)", payload, "meta")
+            elif typ == "monitor_alert":
+                # only the most recent alert of a drain is rendered/popped up
+                latest_alert = payload
+            elif typ == "monitor_suggest":
+                detail = payload
+                suggestion = f"Sugestão: {detail.get('suggest')} (disk {detail.get('disk')}%)"
+                self._append_chat("Analyzer (Monitor)", suggestion, "meta")
+                # ask user for cleaning
+                def ask_clean():
+                    ans = messagebox.askyesno("Monitor - Sugestão", suggestion + "\nDeseja limpar temporários?")
+                    if ans:
+                        self._submit_once("clean_temp", self._on_clean_done, self.monitor.clean_temp_folder, None)
+                self.root.after(50, ask_clean)
+            elif typ == "monitor_action":
+                act = payload
+                self._append_chat("Analyzer (Monitor)", f"Ação executada: {act}", "meta")
+            elif typ == "monitor_log":
+                monitor_logs.append(payload.get("msg") if isinstance(payload, dict) else str(payload))
+        if token_buf:
+            self._append_stream("".join(token_buf))
+        if monitor_logs:
+            self._append_chat("Analyzer (Monitor)", "\n".join(monitor_logs), "meta")
+        if latest_alert is not None:
+            self._handle_monitor_alert(latest_alert)
+
+    def _handle_monitor_alert(self, detail: dict):
+        # detail contains cpu/mem/disk/top_procs
+        summary = f"Alerta: CPU {detail['cpu']}% | RAM {detail['mem']}% | DISCO {detail['disk']}%\nTop processos:\n" + "".join(
+            map(PROC_LINE_FMT, detail.get("top_procs", [])[:3])
+        )
+        # show in chat and also popup
+        self._append_chat("Analyzer (Monitor)", summary, "meta")
+        # if autonomy is not B3 ask user to act (monitor may auto-act depending on settings)
+        autonomy = self._current_settings().get("diagnostic_mode", {}).get("autonomy", "B2")
+        if autonomy != "B3":
+            def ask_handle():
+                ans = messagebox.askyesno("Monitor", summary + "\nDeseja encerrar o processo mais pesado?")
+                if ans:
+                    top = detail.get("top_procs",[])
+                    if top:
+                        pid = top[0].get("pid")
+                        # keyed per pid: a kill for another process is not swallowed by a running one
+                        self._submit_once(f"kill_top:{pid}", self._on_kill_done, self.monitor.kill_process, pid)
+            self.root.after(50, ask_handle)
+
+    # monitor actions run on self._pool; callbacks fire on the worker thread -> _post
+    def _submit_once(self, key: str, on_done, fn, *args) -> Future:
+        # repeated alerts of the same type reuse the running job instead of stacking new ones
+        fut = self._inflight.get(key)
+        if fut is not None and not fut.done():
+            return fut
+        fut = self._pool.submit(fn, *args)
+        self._inflight[key] = fut
+        fut.add_done_callback(on_done)
+        return fut
+
+    def _on_kill_done(self, fut):
+        try:
+            ok, msg = fut.result()
+        except Exception as e:
+            msg = f"falha ao encerrar processo: {e}"
+        self._post("monitor_log", f"Ação: {msg}")
+
+    def _on_clean_done(self, fut):
+        try:
+            res = fut.result()
+        except Exception as e:
+            self._post("monitor_log", f"Limpeza falhou: {e}")
+            return
+        removed = len(res.get("removed", []))
+        failed = len(res.get("failed", []))
+        self._post("monitor_log", f"Limpeza concluída. Removidos: {removed}, Falhas: {failed}")
 
     # thinking animation (label only)
     def _start_thinking(self):
         if self._thinking:
             return
         self._thinking = True
-        self._dots = 0
+        self._dot_cycle = itertools.cycle(THINKING_FRAMES)
+        self._ensure_italic_font()
         self._animate_thinking()
 
+    def _ensure_italic_font(self):
+        if self.italic_font is not None:
+            return
+        self.italic_font = tkfont.Font(family=FONT_NAME, size=FONT_SIZE, slant="italic")
+        # thinking tag defined but we won't insert thinking into chat
+        try:
+            self.chat_display.tag_config("thinking", foreground="#888888", justify="left", font=self.italic_font)
+        except Exception:
+            # older tkinter may reject font tuple; ignore
+            pass
+
     def _animate_thinking(self):
         if not self._thinking:
             self.thinking_label.config(text="")
             return
-        dots = "." * (self._dots % 4)
-        self.thinking_label.config(text=f"Analyzer está pensando{dots}")
-        self._dots += 1
-        self._thinking_job = self.root.after(450, self._animate_thinking)
+        if time.monotonic() - self._last_token_ts < 0.4:
+            # tokens are flowing, the streamed text is the progress indicator
+            txt = ""
+        elif self.root.winfo_viewable():
+            txt = next(self._dot_cycle)
+        else:
+            # minimized/hidden: keep the current text, no redraw
+            txt = self.thinking_label.cget("text")
+        if self.thinking_label.cget("text") != txt:
+            self.thinking_label.config(text=txt)
+        self._thinking_job = self.root.after(700, self._animate_thinking)
 
     def _stop_thinking(self):
         if not self._thinking:
@@ -314,9 +631,13 @@ class AnalyzerApp:
 
 # run
 def main():
-    root = tk.Tk()
-    app = AnalyzerApp(root)
-    root.mainloop()
+    LOG_LISTENER.start()
+    try:
+        root = tk.Tk()
+        app = AnalyzerApp(root)
+        root.mainloop()
+    finally:
+        LOG_LISTENER.stop()
 
 if __name__ == "__main__":
     main()
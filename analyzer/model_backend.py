@@ -3,23 +3,46 @@
 ModelBackend (avançado, versão 'mestre'):
 - Usa Ollama local (modelo qwen2.5:7b-q4_K_M por padrão)
 - /api/chat preferido (stream=True) com leitura buffered e montagem final no backend
-- fallback para /api/generate
+- generate_stream() expõe os tokens conforme chegam (GUI mostra a resposta incrementalmente)
+- fallback para /api/generate (também em streaming, se /api/chat responder 404), reaproveitando o
+  `context` devolvido pelo turno anterior em vez de reenviar o histórico
+- provider="llamacpp" (chave "provider" do analyzer_settings.json): llama.cpp `llama-server` via /v1/chat/completions (batching contínuo), ex.:
+    llama-server -m model.gguf -ngl 99 --parallel 4 --cont-batching --ctx-size 8192 -b 512
 - warmup não-bloqueante
 - history role-structured (system/user/assistant)
 - local solver para aritmética simples (reduz latência em perguntas matemáticas)
-- retries com exponential backoff
+- retries com backoff exponencial com jitter (decorrelated); erros 4xx não são repetidos
+- cache LRU de respostas por (modelo, digest do histórico, prompt; exceto perguntas sobre hora/data) + keep_alive para manter o modelo carregado
 - post-process para remover menções proibidas (providers/trainers)
 """
 
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, Iterator, Generator, Deque, Callable
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import logging
 import os
+import random
 import time
 import threading
+from concurrent.futures import Future, wait, FIRST_COMPLETED
 import re
 import ast
+import hashlib
+import operator
+from functools import lru_cache
+from collections import OrderedDict, deque
+
+from utils import run_daemon
+
+try:
+    import orjson  # optional: C parser for the per-token NDJSON lines
+except ImportError:
+    orjson = None
+try:
+    import numpy as np  # optional: vectorized similarity scan for the semantic cache
+except ImportError:
+    np = None
 
 # logger
 logger = logging.getLogger("ModelBackend")
@@ -40,18 +63,51 @@ with open(SETTINGS_PATH, "r", encoding="utf-8") as f:
 # defaults from settings
 DEFAULT_MODEL = SETTINGS.get("model_name", "qwen2.5:7b-instruct-q4_K_M")
 OLLAMA_HOST = SETTINGS.get("host", "http://127.0.0.1:11434")
+# "ollama" or "llamacpp" (then "host" points at llama-server, e.g. http://127.0.0.1:8080)
+PROVIDER = SETTINGS.get("provider", "ollama")
 OLLAMA_TIMEOUT = SETTINGS.get("network", {}).get("ollama_timeout_seconds", 90)
 OLLAMA_MAX_RETRIES = SETTINGS.get("network", {}).get("ollama_max_retries", 3)
+# keep the model (and its KV prefix) resident between turns (-1 = never unload)
+OLLAMA_KEEP_ALIVE = SETTINGS.get("network", {}).get("ollama_keep_alive", "30m")
+REPLY_CACHE_SIZE = 512
+# socket read size for the streaming readers; Ollama/llama-server reply with chunked
+# transfer-encoding, so a large buffer never holds a token back waiting to fill up
+STREAM_CHUNK_SIZE = 8192
+# both accept the raw bytes of a stream line (no .decode per token)
+_json_loads = orjson.loads if orjson is not None else json.loads
+# semantic cache (opt-in): paraphrases hit a cached reply via Ollama embeddings
+SEMANTIC_CACHE_MODEL = SETTINGS.get("semantic_cache", {}).get("embed_model") or None
+SEMANTIC_CACHE_THRESHOLD = SETTINGS.get("semantic_cache", {}).get("threshold", 0.92)
+SEMANTIC_CACHE_SIZE = 1024
+TEMPERATURE = SETTINGS.get("temperature", 0.12)
 SYSTEM_PROMPT = SETTINGS.get("system_prompt", "Você é o Analyzer — assistente técnico, direto e obediente ao Mestre.")
 PREFERRED_LANGUAGE = "pt-BR"
+# built once: every backend (and every clear_history) shares the same system message
+_SYSTEM_MSG: Dict[str, str] = {"role": "system", "content": SYSTEM_PROMPT}
+# history digest seeds by keep_system (see ModelBackend._push)
+_HISTORY_SEEDS = {
+    True: hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).digest(),
+    False: hashlib.sha256(b"").digest(),
+}
+INITIAL_GREETING = (
+    "Olá, meu nome é Analyzer. Sou uma IA projetada para conversar naturalmente, manter contexto "
+    "e ajudar com tarefas técnicas e gerais. O que deseja saber hoje?"
+)
+
+# reply post-processing patterns (compiled once)
+_WS_TRAIL_RE = re.compile(r"[ \t]+\n")
+_WS_MULTI_RE = re.compile(r"\n{3,}")
+# forbidden terms, word-bounded so e.g. "metade" survives
+_FORBIDDEN_TERMS = r"\b(?:anthropic|openai|meta|trained\s+(?:by|on)|i\s+was\s+trained|i\s+am\s+a(?:\s+large)?)\b"
+# presence check: plain linear scan (the sentence pattern backtracks through [^.?!]* at every offset)
+_FORBIDDEN_TERM_RE = re.compile(_FORBIDDEN_TERMS, re.IGNORECASE)
+# whole sentence containing any forbidden term
+_FORBIDDEN_RE = re.compile(r"[^.?!]*" + _FORBIDDEN_TERMS + r"[^.?!]*[.?!]?", re.IGNORECASE)
 
 # helper: safe arithmetic evaluator (only arithmetic expressions)
-def safe_eval_arith(expr: str):
-    """
-    Safely evaluate a mathematical expression limited to arithmetic ops.
-    Prevents arbitrary code execution by validating AST nodes.
-    """
-    expr = expr.replace("^", "**")
+@lru_cache(maxsize=256)
+def _compile_arith(expr: str):
+    # parse + validate + compile once per distinct expression
     try:
         node = ast.parse(expr, mode="eval")
     except Exception as e:
@@ -59,14 +115,38 @@ def safe_eval_arith(expr: str):
     for n in ast.walk(node):
         if isinstance(n, (ast.Call, ast.Name, ast.Attribute, ast.Subscript, ast.Lambda, ast.Import, ast.ImportFrom)):
             raise ValueError("unsafe expression")
-    compiled = compile(node, "<ast>", "eval")
-    return eval(compiled, {"__builtins__": None}, {})
+    return compile(node, "<ast>", "eval")
+
+def safe_eval_arith(expr: str):
+    """
+    Safely evaluate a mathematical expression limited to arithmetic ops.
+    Prevents arbitrary code execution by validating AST nodes.
+    """
+    expr = expr.replace("^", "**")
+    return eval(_compile_arith(expr), {"__builtins__": None}, {})
+
+# fast path for "a <op> b": no AST work at all
+_SIMPLE_OP_RE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*([+\-*/])\s*(-?\d+(?:\.\d+)?)\s*$")
+_SIMPLE_OPS = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv}
+
+def _num(tok: str):
+    return float(tok) if "." in tok else int(tok)
 
 # basic enunciado solver (linear forms like "se eu dobro um número e somo 6 o resultado é 26")
+# time-dependent prompts: their replies are never served from the cache
+_NONCACHEABLE_RE = re.compile(r"\b(?:hora|agora|hoje|now|current)\b", re.IGNORECASE)
+
+# local solver patterns (compiled once; the enunciado ones run on lowercased text)
+_MATH_INTENT_RE = re.compile(r"(qual(?: é| e)?|quanto(?: é| )?)\s*([0-9\.\+\-\*\/\^\(\) ]+)$", re.IGNORECASE)
+_ENUN_DOBRO_RE = re.compile(r"dobr[oa] (?:um )?n[úu]mero.*som[ao]\s*(-?\d+\.?\d*)[, ]+.*resultado.*?(-?\d+\.?\d*)")
+_ENUN_MULT_RE = re.compile(r"multiplic[ao]r? (?:por )?(-?\d+\.?\d*)")
+_ENUN_RES_RE = re.compile(r"resultado.*?(-?\d+\.?\d*)")
+_ENUN_ADD_RE = re.compile(r"(som[ao]|mais)\s*(-?\d+\.?\d*)")
+
 def solve_simple_enunciado(text: str) -> Optional[str]:
     s = text.lower()
     # try pattern: "dobro ... somo 6 ... resultado é 26"
-    m = re.search(r"dobr[oa] (?:um )?n[úu]mero.*som[ao]\s*(-?\d+\.?\d*)[, ]+.*resultado.*?(-?\d+\.?\d*)", s)
+    m = _ENUN_DOBRO_RE.search(s)
     if m:
         try:
             mult = 2.0
@@ -85,11 +165,11 @@ def solve_simple_enunciado(text: str) -> Optional[str]:
     elif "trip" in s:
         mult = 3.0
     else:
-        m_mul = re.search(r"multiplic[ao]r? (?:por )?(-?\d+\.?\d*)", s)
+        m_mul = _ENUN_MULT_RE.search(s)
         if m_mul:
             mult = float(m_mul.group(1))
-    m_res = re.search(r"resultado.*?(-?\d+\.?\d*)", s)
-    m_add = re.search(r"(som[ao]|mais)\s*(-?\d+\.?\d*)", s)
+    m_res = _ENUN_RES_RE.search(s)
+    m_add = _ENUN_ADD_RE.search(s)
     sign = 0.0
     if m_add:
         sign = float(m_add.group(2))
@@ -104,48 +184,260 @@ def solve_simple_enunciado(text: str) -> Optional[str]:
             pass
     return None
 
+# retry schedule: decorrelated jitter, so concurrent callers don't hit Ollama in lockstep
+RETRY_BASE_WAIT = 0.5
+RETRY_MAX_WAIT = 30
+
+def _next_backoff(prev: float) -> float:
+    return min(RETRY_MAX_WAIT, random.uniform(RETRY_BASE_WAIT, prev * 3))
+
+def _is_retriable(exc: requests.exceptions.RequestException) -> bool:
+    # timeouts / connection errors / 5xx may pass; any other 4xx is a bad request
+    # (unknown model, invalid payload) and will fail the same way every time
+    resp = getattr(exc, "response", None)
+    if resp is None:
+        return True
+    return not (400 <= resp.status_code < 500) or resp.status_code in (408, 429)
+
+# streamed-object content extractors (Ollama chat / generate, and text-completion shapes)
+def _content_message(obj: Dict[str, Any]) -> Optional[str]:
+    msg = obj.get("message")
+    return msg.get("content") if isinstance(msg, dict) else None
+
+def _content_choice(obj: Dict[str, Any]) -> Optional[str]:
+    choices = obj.get("choices")
+    if choices and isinstance(choices[0], dict):
+        return choices[0].get("text")
+    return None
+
+_EXTRACTORS = (
+    ("message", _content_message),
+    ("response", lambda obj: obj.get("response")),
+    ("text", lambda obj: obj.get("text")),
+    ("choices", _content_choice),
+)
+
+def _detect_extractor(obj: Dict[str, Any]) -> Optional[Callable[[Dict[str, Any]], Optional[str]]]:
+    for key, fn in _EXTRACTORS:
+        if key in obj:
+            return fn
+    return None
+
+def _iter_stream_lines(resp) -> Iterator[bytes]:
+    """Split a streamed response body into lines (NDJSON / SSE framing)."""
+    # one growing buffer per response; line boundaries found with bytearray.find and
+    # copied out through a memoryview, so each line costs a single bytes allocation
+    buf = bytearray()
+    for chunk in resp.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+        buf += chunk
+        start = 0
+        with memoryview(buf) as mv:
+            while True:
+                nl = buf.find(b"\n", start)
+                if nl == -1:
+                    break
+                if nl > start:
+                    yield bytes(mv[start:nl])
+                start = nl + 1
+        if start:
+            del buf[:start]
+    if buf.strip():
+        yield bytes(buf)
+
+def _iter_stream_objects(resp) -> Iterator[Any]:
+    """Parse an NDJSON response body; malformed lines are skipped."""
+    if orjson is None:
+        for raw in _iter_stream_lines(resp):
+            try:
+                yield json.loads(raw)
+            except ValueError:
+                continue
+        return
+    # orjson reads memoryview slices, so every complete line of a received chunk is
+    # parsed straight out of the buffer in one pass (no per-line bytes copy)
+    loads, bad = orjson.loads, orjson.JSONDecodeError
+    buf = bytearray()
+    for chunk in resp.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+        buf += chunk
+        start = 0
+        objs = []
+        with memoryview(buf) as mv:
+            while True:
+                nl = buf.find(b"\n", start)
+                if nl == -1:
+                    break
+                if nl > start:
+                    try:
+                        objs.append(loads(mv[start:nl]))
+                    except bad:
+                        pass
+                start = nl + 1
+        # views are released before the consumed prefix is dropped (resizing needs no exports)
+        if start:
+            del buf[:start]
+        yield from objs
+    if buf.strip():
+        try:
+            yield loads(buf)
+        except bad:
+            pass
+
 class ModelBackend:
-    def __init__(self, provider: str = "ollama", model_name: Optional[str] = None, host: str = None):
-        self.provider = provider
+    def __init__(self, provider: Optional[str] = None, model_name: Optional[str] = None, host: str = None):
+        self.provider = provider = provider or PROVIDER
         self.model_name = model_name or DEFAULT_MODEL
         self.host = (host or OLLAMA_HOST).rstrip("/")
-        self.history: List[Dict[str,str]] = [{"role":"system","content":SYSTEM_PROMPT}]
+        # system message kept apart; history holds only the last N user/assistant turns
+        self.history_capacity = SETTINGS.get("max_context_messages", 120)
+        self._system_msg: Optional[Dict[str,str]] = _SYSTEM_MSG
+        self.history: Deque[Dict[str,str]] = deque(maxlen=self.history_capacity)
+        # immutable (system, *turns) view republished on every change; readers take it without the lock
+        self._snapshot: Tuple[Dict[str,str], ...] = (self._system_msg,)
         self.warmup_done = False
+        # generate_stream request id -> undo token of its user turn (None until pushed);
+        # ids flagged by cancel(), possibly before their stream even started
+        self._active_requests: Dict[str, Optional[tuple]] = {}
+        self._cancelled = set()
+        # LRU of model replies keyed by (model, history, prompt) -> see _cache_key
+        self._reply_cache: "OrderedDict[str, str]" = OrderedDict()
+        # running digest of the conversation, chained on every push (never recomputed)
+        self._history_digest = self._seed_digest(True)
+        # conversation digest right before the latest user turn (semantic cache scope)
+        self._turn_scope = self._history_digest
+        # key -> (scope, unit embedding, reply); only used with SEMANTIC_CACHE_MODEL on ollama
+        self._sem_cache: "OrderedDict[str, Tuple[bytes, Any, str]]" = OrderedDict()
+        self._semantic = bool(SEMANTIC_CACHE_MODEL) and provider == "ollama"
         self.lock = threading.Lock()
+        # one keep-alive connection pool for every call to the host (chat, generate, warmup)
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+        self._session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+        self._session.headers.update({"Connection": "keep-alive"})
+        # provider resolved once: generate()/generate_stream() call the bound impl directly
+        impls = {
+            "ollama": (self._generate_remote, self._stream_remote),
+            "llamacpp": (self._generate_remote, self._stream_remote),
+        }
+        self._generate_impl, self._stream_impl = impls.get(provider, (self._generate_placeholder, self._stream_placeholder))
+        # False once the host answered 404 on /api/chat (older Ollama): later calls go straight to /api/generate
+        self._chat_api = True
+        # (context, messages, reply) of the last finished /api/generate stream -> _iter_generate_api
+        self._gen_context: Optional[Tuple[List[int], List[Dict[str,str]], str]] = None
+        # chunk sources for the remote path: (messages endpoint, prompt-only fallback)
+        if provider == "llamacpp":
+            self._chat_iter = self._prompt_iter = self._iter_openai_chat_api
+        else:
+            self._chat_iter, self._prompt_iter = self._iter_chat_api, self._iter_generate_api
         logger.info(f"[ModelBackend] init provider={self.provider} model={self.model_name} host={self.host}")
-        # warmup in background
-        t = threading.Thread(target=self._warmup_safe, daemon=True)
-        t.start()
+        self._closed: Future = Future()
+        # warmup in background (daemon: a host that never answers must not hold up exit);
+        # initialize() lets callers wait for it
+        self._warmup_future = run_daemon(self._warmup_safe)
+
+    def close(self):
+        if not self._closed.done():
+            self._closed.set_result(True)
+        try:
+            self._session.close()
+        except Exception:
+            pass
 
     # ---------------- history helpers ----------------
-    def push_user(self, text: str):
+    @staticmethod
+    def _seed_digest(keep_system: bool) -> bytes:
+        return _HISTORY_SEEDS[keep_system]
+
+    @staticmethod
+    def _chain(digest: bytes, role: str, text: str) -> bytes:
+        return hashlib.sha256(digest + role.encode("ascii") + b"\x1e" + text.encode("utf-8")).digest()
+
+    def _push(self, role: str, text: str, cancel_id: Optional[str] = None) -> Optional[tuple]:
+        """
+        Acrescenta um turno; devolve o token que _retract() usa para desfazê-lo.
+        Com cancel_id já cancelado nada é gravado e devolve None.
+        """
         with self.lock:
-            self.history.append({"role":"user","content":text})
-            # keep last N messages
-            max_msgs = SETTINGS.get("max_context_messages", 120)
-            if len(self.history) > max_msgs + 1:  # +1 for system
-                # keep system + last max_msgs
-                self.history = [self.history[0]] + self.history[-max_msgs:]
+            if cancel_id is not None and cancel_id in self._cancelled:
+                return None
+            entry = {"role":role,"content":text}
+            h = self.history
+            undo = (entry, h[0] if len(h) == h.maxlen else None, self._history_digest, self._turn_scope)
+            # deque(maxlen) evicts the oldest turn on its own
+            h.append(entry)
+            self._publish_snapshot()
+            if role == "user":
+                self._turn_scope = self._history_digest
+            self._history_digest = self._chain(self._history_digest, role, text)
+            return undo
 
-    def push_assistant(self, text: str):
+    def _retract(self, undo: Optional[tuple]):
+        # drop a turn again (cancelled stream), found by identity; no-op if it is already gone
+        # (history cleared, or retracted before)
+        if undo is None:
+            return
+        entry, evicted, digest, scope = undo
         with self.lock:
-            self.history.append({"role":"assistant","content":text})
-            max_msgs = SETTINGS.get("max_context_messages", 120)
-            if len(self.history) > max_msgs + 1:
-                self.history = [self.history[0]] + self.history[-max_msgs:]
+            h = self.history
+            if h and h[-1] is entry:
+                h.pop()
+                if evicted is not None:
+                    h.appendleft(evicted)
+                self._history_digest, self._turn_scope = digest, scope
+            else:
+                for i, turn in enumerate(h):
+                    if turn is entry:
+                        del h[i]
+                        break
+                else:
+                    return
+                # newer turns were chained on top of it: rebuild the digest from what is left
+                self._rehash()
+            self._publish_snapshot()
+
+    def _rehash(self):
+        # caller holds self.lock
+        digest = scope = self._seed_digest(self._system_msg is not None)
+        for turn in self.history:
+            if turn["role"] == "user":
+                scope = digest
+            digest = self._chain(digest, turn["role"], turn["content"])
+        self._history_digest, self._turn_scope = digest, scope
+
+    def push_user(self, text: str, cancel_id: Optional[str] = None) -> Optional[tuple]:
+        return self._push("user", text, cancel_id)
+
+    def push_assistant(self, text: str):
+        self._push("assistant", text)
+
+    def _publish_snapshot(self):
+        # caller holds self.lock
+        if self._system_msg is None:
+            self._snapshot = tuple(self.history)
+        else:
+            self._snapshot = (self._system_msg, *self.history)
+
+    def _history_snapshot(self) -> List[Dict[str,str]]:
+        # attribute read is atomic; the tuple itself never changes
+        return list(self._snapshot)
 
     def export_history(self) -> List[Dict[str,str]]:
-        with self.lock:
-            return list(self.history)
+        return self._history_snapshot()
 
     def clear_history(self, keep_system: bool = True):
         with self.lock:
-            if keep_system:
-                self.history = [{"role":"system","content":SYSTEM_PROMPT}]
-            else:
-                self.history = []
+            self.history.clear()
+            self._system_msg = _SYSTEM_MSG if keep_system else None
+            self._publish_snapshot()
+            self._history_digest = self._seed_digest(keep_system)
+            self._turn_scope = self._history_digest
 
     # ---------------- warmup ----------------
+    def initialize(self, timeout: Optional[float] = None) -> bool:
+        """Espera o warmup em background (no máximo timeout s). Retorna warmup_done."""
+        # close() resolves _closed, so a shutdown never sits out the rest of the wait
+        wait([self._warmup_future, self._closed], timeout=timeout, return_when=FIRST_COMPLETED)
+        return self.warmup_done
+
     def _warmup_safe(self):
         try:
             self._warmup()
@@ -156,8 +448,15 @@ class ModelBackend:
         if self.warmup_done:
             return
         try:
-            # tiny request to reduce first-response oddities
-            _ = self.generate("pong", prefer_chat=True, max_tokens=8, timeout=8)
+            # load the model without a prompt: nothing is decoded and history/cache stay untouched
+            if self.provider == "ollama":
+                resp = self._session.post(f"{self.host}/api/generate",
+                                          json={"model": self.model_name, "keep_alive": OLLAMA_KEEP_ALIVE},
+                                          timeout=OLLAMA_TIMEOUT)
+                resp.raise_for_status()
+            elif self.provider == "llamacpp":
+                # llama-server loads the model at launch; just open the pooled connection
+                self._session.get(f"{self.host}/health", timeout=8).raise_for_status()
             self.warmup_done = True
             logger.info("[ModelBackend] warmup completed")
         except Exception as e:
@@ -165,50 +464,58 @@ class ModelBackend:
 
     # ---------------- networking helpers ----------------
     def _compose_messages(self, user_prompt: str) -> List[Dict[str,str]]:
-        with self.lock:
-            msgs = list(self.history)
-        msgs.append({"role":"user","content":user_prompt})
-        return msgs
+        # generate() already pushed the prompt; sending history as-is keeps the message
+        # prefix identical across turns so Ollama can reuse its KV cache
+        snap = self._snapshot
+        last = snap[-1] if snap else None
+        if last is not None and last["role"] == "user" and last["content"] == user_prompt:
+            return list(snap)
+        return [*snap, {"role":"user","content":user_prompt}]
 
-    def _call_chat_api(self, messages: List[Dict[str,str]], max_tokens: int = 1024, timeout: int = OLLAMA_TIMEOUT) -> str:
+    def _chat_payload(self, messages: List[Dict[str,str]], max_tokens: int) -> Dict[str,Any]:
+        return {
+            "model": self.model_name,
+            "messages": messages,
+            "stream": True,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": {"num_predict": max_tokens, "temperature": TEMPERATURE},
+        }
+
+    def _iter_chat_api(self, messages: List[Dict[str,str]], max_tokens: int = 1024, timeout: int = OLLAMA_TIMEOUT) -> Iterator[str]:
         url = f"{self.host}/api/chat"
-        payload = {"model": self.model_name, "messages": messages, "stream": True, "max_tokens": max_tokens}
+        payload = self._chat_payload(messages, max_tokens)
         headers = {"Content-Type":"application/json"}
-        parts: List[str] = []
-        with requests.post(url, json=payload, headers=headers, stream=True, timeout=timeout) as resp:
+        with self._session.post(url, json=payload, headers=headers, stream=True, timeout=timeout) as resp:
             resp.raise_for_status()
-            for raw in resp.iter_lines(decode_unicode=False):
-                if not raw:
-                    continue
-                try:
-                    obj = json.loads(raw.decode("utf-8"))
-                except Exception:
+            extract = None
+            for obj in _iter_stream_objects(resp):
+                if not isinstance(obj, dict):
                     continue
-                if isinstance(obj, dict):
-                    # support multiple formats
-                    if "message" in obj and isinstance(obj["message"], dict):
-                        content = obj["message"].get("content")
-                        if isinstance(content, str):
-                            parts.append(content)
-                    elif "response" in obj and isinstance(obj["response"], str):
-                        parts.append(obj["response"])
-                    elif "text" in obj and isinstance(obj["text"], str):
-                        parts.append(obj["text"])
-                    elif "choices" in obj and isinstance(obj["choices"], list) and obj["choices"]:
-                        c0 = obj["choices"][0]
-                        if isinstance(c0, dict) and "text" in c0:
-                            parts.append(c0["text"])
+                # response shape is fixed for a whole stream: detect it once, then call directly
+                if extract is None:
+                    extract = _detect_extractor(obj)
+                if extract is not None:
+                    content = extract(obj)
+                    if content:
+                        yield content
                 if obj.get("done"):
                     break
-        assembled = "".join(parts).strip()
-        return self._post_process_reply(assembled)
 
-    def _call_generate_api(self, messages: List[Dict[str,str]], max_tokens:int=1024, timeout:int=OLLAMA_TIMEOUT) -> str:
+    def _iter_generate_api(self, messages: List[Dict[str,str]], max_tokens:int=1024, timeout:int=OLLAMA_TIMEOUT) -> Iterator[str]:
         url = f"{self.host}/api/generate"
+        # KV reuse: if these messages are exactly the last request plus (its reply, a new user
+        # turn), send only the new turn with the `context` Ollama returned for that request
+        prev = self._gen_context
+        n = len(prev[1]) if prev else 0
+        if (prev and len(messages) == n + 2 and messages[n]["role"] == "assistant"
+                and messages[n]["content"] == prev[2] and messages[:n] == prev[1]):
+            yield from self._stream_generate(url, f"\nUsuário: {messages[-1]['content']}\n\nAnalyzer:",
+                                             messages, max_tokens, timeout, context=prev[0])
+            return
         # fallback: build prompt from system + recent history
         system_part = SYSTEM_PROMPT
         snippet = ""
-        for m in messages[-(SETTINGS.get("max_context_messages",120)+1):]:
+        for m in messages[-(self.history_capacity + 1):]:
             role = m.get("role")
             content = m.get("content","")
             if role == "system":
@@ -218,100 +525,253 @@ class ModelBackend:
             else:
                 snippet += f"Analyzer: {content}\n"
         prompt = f"{system_part}\n\n{snippet}\nAnalyzer:"
-        payload = {"model": self.model_name, "prompt": prompt, "stream": True, "max_tokens": max_tokens}
+        yield from self._stream_generate(url, prompt, messages, max_tokens, timeout)
+
+    def _stream_generate(self, url: str, prompt: str, messages: List[Dict[str,str]], max_tokens: int,
+                         timeout: int, context: Optional[List[int]] = None) -> Iterator[str]:
+        payload = {"model": self.model_name, "prompt": prompt, "stream": True, "keep_alive": OLLAMA_KEEP_ALIVE, "options": {"num_predict": max_tokens, "temperature": TEMPERATURE}}
+        if context is not None:
+            payload["context"] = context
         headers = {"Content-Type":"application/json"}
-        parts = []
-        with requests.post(url, data=json.dumps(payload), headers=headers, stream=True, timeout=timeout) as resp:
+        parts: List[str] = []
+        with self._session.post(url, data=json.dumps(payload), headers=headers, stream=True, timeout=timeout) as resp:
             resp.raise_for_status()
-            for raw in resp.iter_lines(decode_unicode=False):
-                if not raw:
+            extract = None
+            for obj in _iter_stream_objects(resp):
+                if not isinstance(obj, dict):
                     continue
+                if extract is None:
+                    extract = _detect_extractor(obj)
+                if extract is not None:
+                    content = extract(obj)
+                    if content:
+                        parts.append(content)
+                        yield content
+                if obj.get("done"):
+                    # encoded conversation (prompt + reply) for the next turn's warm start; only
+                    # usable if history will hold exactly the text the model produced
+                    raw = "".join(parts)
+                    if isinstance(obj.get("context"), list) and self._post_process_reply(raw.strip()) == raw:
+                        with self.lock:
+                            self._gen_context = (obj["context"], list(messages), raw)
+                    break
+
+    def _iter_openai_chat_api(self, messages: List[Dict[str,str]], max_tokens: int = 1024, timeout: int = OLLAMA_TIMEOUT) -> Iterator[str]:
+        # llama.cpp `llama-server` (OpenAI-compatible, server-sent events)
+        url = f"{self.host}/v1/chat/completions"
+        payload = {"model": self.model_name, "messages": messages, "stream": True, "max_tokens": max_tokens, "temperature": TEMPERATURE}
+        with self._session.post(url, json=payload, stream=True, timeout=timeout) as resp:
+            resp.raise_for_status()
+            for raw in _iter_stream_lines(resp):
+                if not raw.startswith(b"data:"):
+                    continue
+                data = raw[5:].strip()
+                if data == b"[DONE]":
+                    break
                 try:
-                    obj = json.loads(raw.decode("utf-8"))
+                    obj = _json_loads(data)
                 except Exception:
                     continue
-                if isinstance(obj, dict):
-                    if "response" in obj and isinstance(obj["response"], str):
-                        parts.append(obj["response"])
-                    elif "text" in obj and isinstance(obj["text"], str):
-                        parts.append(obj["text"])
-                    elif "choices" in obj and isinstance(obj["choices"], list) and obj["choices"]:
-                        c0 = obj["choices"][0]
-                        if isinstance(c0, dict) and "text" in c0:
-                            parts.append(c0["text"])
-                if obj.get("done"):
+                choices = obj.get("choices") if isinstance(obj, dict) else None
+                if not choices or not isinstance(choices[0], dict):
+                    continue
+                content = (choices[0].get("delta") or {}).get("content")
+                if isinstance(content, str):
+                    yield content
+                if choices[0].get("finish_reason"):
                     break
-        assembled = "".join(parts).strip()
-        return self._post_process_reply(assembled)
+
+    def _chat_unavailable(self, exc: requests.exceptions.RequestException) -> bool:
+        # older Ollama without /api/chat: remember it so no later request repeats the 404 round-trip
+        resp = getattr(exc, "response", None)
+        if self.provider != "ollama" or resp is None or resp.status_code != 404:
+            return False
+        if self._chat_api:
+            self._chat_api = False
+            logger.info("[ModelBackend] /api/chat not available, using /api/generate")
+        return True
 
     # ---------------- post process ----------------
     def _post_process_reply(self, text: str) -> str:
         if not text:
             return ""
-        text = re.sub(r"[ \t]+\n", "\n", text)
-        text = re.sub(r"\n{3,}", "\n\n", text).strip()
-        # remove forbidden provider mentions
-        forbidden = [r"anthropic", r"openai", r"meta", r"trained by", r"i was trained", r"i am a"]
-        low = text.lower()
-        for f in forbidden:
-            if re.search(f, low):
-                text = re.sub(r"(?i)[^.?!]*" + re.escape(f) + r"[^.?!]*[.?!]?", "", text).strip()
+        text = _WS_TRAIL_RE.sub("\n", text)
+        text = _WS_MULTI_RE.sub("\n\n", text).strip()
+        # remove forbidden provider mentions; most replies have none and stop at the cheap scan
+        if _FORBIDDEN_TERM_RE.search(text):
+            text = _FORBIDDEN_RE.sub("", text).strip()
         if not text:
             return "[ERRO] Resposta removida por política interna."
         return text
 
-    # ---------------- main public interface ----------------
-    def generate(self, user_prompt: str, max_tokens: int = 1024, prefer_chat: bool = True, timeout: int = OLLAMA_TIMEOUT) -> str:
-        user_prompt = (user_prompt or "").strip()
-        if not user_prompt:
-            return ""
-        # push user to history
+    # ---------------- reply cache ----------------
+    def _cache_key(self, user_prompt: str) -> Optional[str]:
+        # None -> prompt must always reach the model
+        if _NONCACHEABLE_RE.search(user_prompt):
+            return None
+        normalized = " ".join(user_prompt.split())
+        # single attribute read of immutable bytes: no lock needed
+        digest = self._history_digest.hex()
+        raw = f"{self.model_name}\x1f{normalized}\x1f{digest}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key: Optional[str]) -> Optional[str]:
+        if key is None:
+            return None
+        # lookup is lock-free (a miss is the common case); only the LRU bump mutates
+        reply = self._reply_cache.get(key)
+        if reply is not None:
+            with self.lock:
+                if key in self._reply_cache:
+                    self._reply_cache.move_to_end(key)
+        return reply
+
+    def _cache_put(self, key: Optional[str], reply: str):
+        # errors/fallbacks are never cached
+        if key is None or not reply or reply.startswith("[ERRO"):
+            return
+        with self.lock:
+            self._reply_cache[key] = reply
+            self._reply_cache.move_to_end(key)
+            while len(self._reply_cache) > REPLY_CACHE_SIZE:
+                self._reply_cache.popitem(last=False)
+
+    # ---------------- semantic cache ----------------
+    def _embed(self, text: str) -> Optional[Any]:
         try:
-            self.push_user(user_prompt)
-        except Exception:
-            pass
+            resp = self._session.post(f"{self.host}/api/embeddings",
+                                      json={"model": SEMANTIC_CACHE_MODEL, "prompt": text}, timeout=10)
+            resp.raise_for_status()
+            vec = resp.json().get("embedding")
+        except Exception as e:
+            logger.debug(f"[ModelBackend] embedding failed: {e}")
+            return None
+        if not vec:
+            return None
+        # stored normalized, so cosine similarity is a plain dot product
+        if np is not None:
+            v = np.asarray(vec, dtype=np.float32)
+            n = float(np.linalg.norm(v))
+            return v / n if n else None
+        n = sum(x * x for x in vec) ** 0.5
+        return [x / n for x in vec] if n else None
 
-        # local solver for speed on math/simple enunciados
+    def _semantic_get(self, cache_key: Optional[str], user_prompt: str) -> Tuple[Optional[str], Optional[tuple]]:
+        """Retorna (resposta em cache ou None, token para _semantic_put)."""
+        if not self._semantic or cache_key is None:
+            return None, None
+        scope = self._turn_scope
+        q = self._embed(user_prompt)
+        if q is None:
+            return None, None
+        with self.lock:
+            # only entries from the same conversation state can answer this turn
+            cands = [(k, v, r) for k, (sc, v, r) in self._sem_cache.items() if sc == scope]
+        best_key, best_reply, best_sim = None, None, -1.0
+        if cands and np is not None:
+            sims = np.vstack([v for _, v, _ in cands]) @ q
+            i = int(np.argmax(sims))
+            best_key, _, best_reply = cands[i]
+            best_sim = float(sims[i])
+        else:
+            for k, v, r in cands:
+                sim = sum(a * b for a, b in zip(v, q))
+                if sim > best_sim:
+                    best_key, best_reply, best_sim = k, r, sim
+        if best_key is not None and best_sim >= SEMANTIC_CACHE_THRESHOLD:
+            with self.lock:
+                if best_key in self._sem_cache:
+                    self._sem_cache.move_to_end(best_key)
+            logger.info(f"[ModelBackend] semantic cache hit (sim={best_sim:.3f})")
+            return best_reply, None
+        return None, (scope, q)
+
+    def _semantic_put(self, cache_key: Optional[str], token: Optional[tuple], reply: str):
+        if token is None or cache_key is None or not reply or reply.startswith("[ERRO"):
+            return
+        scope, q = token
+        with self.lock:
+            self._sem_cache[cache_key] = (scope, q, reply)
+            self._sem_cache.move_to_end(cache_key)
+            while len(self._sem_cache) > SEMANTIC_CACHE_SIZE:
+                self._sem_cache.popitem(last=False)
+
+    # ---------------- local solver ----------------
+    def _local_answer(self, user_prompt: str) -> Optional[str]:
         try:
             # direct arithmetic: "qual é 2+2" or "quanto é 2+2"
-            m_ar = re.search(r"(qual(?: é| e)?|quanto(?: é| )?)\s*([0-9\.\+\-\*\/\^\(\) ]+)$", user_prompt.lower())
+            m_ar = _MATH_INTENT_RE.search(user_prompt)
             if m_ar:
                 expr = m_ar.group(2).strip()
+                m_op = _SIMPLE_OP_RE.match(expr)
+                if m_op:
+                    a, op, b = m_op.groups()
+                    return str(_SIMPLE_OPS[op](_num(a), _num(b)))
                 val = safe_eval_arith(expr)
-                ans = str(val)
-                self.push_assistant(ans)
-                return ans
+                return str(val)
         except Exception:
             pass
         # enunciado solver
         try:
             s = solve_simple_enunciado(user_prompt)
             if s:
-                self.push_assistant(s)
                 return s
         except Exception:
             pass
+        return None
 
-        # network / model path
-        if self.provider != "ollama":
-            reply = f"[SIMULADO] {user_prompt}"
-            try:
-                self.push_assistant(reply)
-            except Exception:
-                pass
-            return reply
+    # ---------------- main public interface ----------------
+    def generate(self, user_prompt: str, max_tokens: int = 1024, prefer_chat: bool = True, timeout: int = OLLAMA_TIMEOUT) -> str:
+        user_prompt = (user_prompt or "").strip()
+        if not user_prompt:
+            return ""
+        # cache key covers the conversation state *before* this prompt
+        cache_key = self._cache_key(user_prompt)
+        # push user to history
+        try:
+            self.push_user(user_prompt)
+        except Exception:
+            pass
+
+        # local solver for speed on math/simple enunciados
+        local = self._local_answer(user_prompt)
+        if local is not None:
+            self.push_assistant(local)
+            return local
+
+        # network / model path (implementation bound per provider in __init__)
+        return self._generate_impl(user_prompt, cache_key, max_tokens, prefer_chat, timeout)
+
+    def _generate_placeholder(self, user_prompt: str, cache_key: Optional[str], max_tokens: int, prefer_chat: bool, timeout: int) -> str:
+        reply = f"[SIMULADO] {user_prompt}"
+        try:
+            self.push_assistant(reply)
+        except Exception:
+            pass
+        return reply
+
+    def _generate_remote(self, user_prompt: str, cache_key: Optional[str], max_tokens: int, prefer_chat: bool, timeout: int) -> str:
+        cached = self._cache_get(cache_key)
+        sem_token = None
+        if cached is None:
+            cached, sem_token = self._semantic_get(cache_key, user_prompt)
+        if cached is not None:
+            self.push_assistant(cached)
+            return cached
 
         attempt = 0
+        backoff = RETRY_BASE_WAIT
         last_exc = None
+        prefer_chat = prefer_chat and self._chat_api
         while attempt <= OLLAMA_MAX_RETRIES:
             try:
                 messages = self._compose_messages(user_prompt)
-                if prefer_chat:
-                    reply = self._call_chat_api(messages, max_tokens=max_tokens, timeout=timeout)
-                else:
-                    reply = self._call_generate_api(messages, max_tokens=max_tokens, timeout=timeout)
+                chunks = (self._chat_iter if prefer_chat else self._prompt_iter)(messages, max_tokens=max_tokens, timeout=timeout)
+                reply = self._post_process_reply("".join(chunks).strip())
                 if not reply:
                     reply = "[ERRO] Resposta vazia do modelo."
+                self._cache_put(cache_key, reply)
+                self._semantic_put(cache_key, sem_token, reply)
                 try:
                     self.push_assistant(reply)
                 except Exception:
@@ -319,32 +779,197 @@ class ModelBackend:
                 return reply
             except requests.exceptions.RequestException as e:
                 last_exc = e
+                if prefer_chat and self._chat_unavailable(e):
+                    prefer_chat = False
+                    continue
+                if not _is_retriable(e):
+                    logger.warning(f"[ModelBackend] request rejected: {e}")
+                    break
                 attempt += 1
-                wait = min(2 * (2 ** (attempt - 1)), 30)
-                logger.warning(f"[ModelBackend] request error attempt {attempt}: {e} -> waiting {wait}s")
-                time.sleep(wait)
+                backoff = _next_backoff(backoff)
+                logger.warning(f"[ModelBackend] request error attempt {attempt}: {e} -> waiting {backoff:.1f}s")
+                time.sleep(backoff)
             except Exception as e:
                 last_exc = e
                 logger.exception("[ModelBackend] unexpected error")
                 break
 
-        fallback = (
-            "[ERRO OLLAMA] Max retries exceeded contacting Ollama. Resposta fallback.\n\n"
-            "Verifique se Ollama está rodando e se o modelo foi baixado. "
-            f"Host: {self.host} | Modelo: {self.model_name}\n"
-            "Sugestão: rode `ollama status` e `ollama list` no terminal."
-        )
+        fallback = self._fallback_message()
         try:
             self.push_assistant(fallback)
         except Exception:
             pass
         return fallback
 
-    def initial_assistant_greeting(self) -> str:
-        greeting = (
-            "Olá, meu nome é Analyzer. Sou uma IA projetada para conversar naturalmente, manter contexto "
-            "e ajudar com tarefas técnicas e gerais. O que deseja saber hoje?"
+    def generate_stream(self, user_prompt: str, max_tokens: int = 1024, prefer_chat: bool = True, timeout: int = OLLAMA_TIMEOUT, request_id: Optional[str] = None) -> Generator[str, None, str]:
+        """
+        Versão streaming de generate(): produz os pedaços de texto conforme chegam do Ollama.
+        Retries só acontecem antes do primeiro pedaço. Ao terminar, a resposta final
+        (pós-processada) vai para o histórico e é o valor de retorno do gerador
+        (StopIteration.value; "" se cancelado).
+        Com request_id, cancel(request_id) interrompe o stream e fecha a conexão.
+        """
+        user_prompt = (user_prompt or "").strip()
+        if not user_prompt:
+            return ""
+        if request_id is not None:
+            # registered before anything else so cancel() can reach it at any point
+            with self.lock:
+                if request_id in self._cancelled:
+                    self._cancelled.discard(request_id)
+                    return ""
+                self._active_requests[request_id] = None
+        try:
+            return (yield from self._generate_stream(user_prompt, max_tokens, prefer_chat, timeout, request_id))
+        finally:
+            if request_id is not None:
+                with self.lock:
+                    self._active_requests.pop(request_id, None)
+                    self._cancelled.discard(request_id)
+
+    def _generate_stream(self, user_prompt: str, max_tokens: int, prefer_chat: bool, timeout: int, request_id: Optional[str]) -> Generator[str, None, str]:
+        cache_key = self._cache_key(user_prompt)
+        undo = self.push_user(user_prompt, cancel_id=request_id)
+        if request_id is not None:
+            with self.lock:
+                cancelled = request_id in self._cancelled
+                if not cancelled:
+                    # from here on cancel() retracts the user turn itself
+                    self._active_requests[request_id] = undo
+            if cancelled:
+                # cancel() landed between the push and the registration above
+                self._retract(undo)
+                return ""
+
+        local = self._local_answer(user_prompt)
+        if local is not None:
+            if self._push("assistant", local, cancel_id=request_id) is None:
+                return ""
+            yield local
+            return local
+
+        try:
+            reply = yield from self._stream_impl(user_prompt, cache_key, max_tokens, prefer_chat, timeout, request_id)
+        except GeneratorExit:
+            # consumer abandoned the stream: same as a cancel
+            self._retract(undo)
+            raise
+        if reply is None:
+            # cancelled: no assistant turn, so the user turn goes too (no user/user pair in history)
+            self._retract(undo)
+            return ""
+        return reply
+
+    def _stream_placeholder(self, user_prompt: str, cache_key: Optional[str], max_tokens: int, prefer_chat: bool, timeout: int, request_id: Optional[str]) -> Generator[str, None, str]:
+        reply = f"[SIMULADO] {user_prompt}"
+        try:
+            self.push_assistant(reply)
+        except Exception:
+            pass
+        yield reply
+        return reply
+
+    def _stream_remote(self, user_prompt: str, cache_key: Optional[str], max_tokens: int, prefer_chat: bool, timeout: int, request_id: Optional[str]) -> Generator[str, None, Optional[str]]:
+        # returns the final reply, or None when cancelled
+        cached = self._cache_get(cache_key)
+        sem_token = None
+        if cached is None:
+            cached, sem_token = self._semantic_get(cache_key, user_prompt)
+        if cached is not None:
+            if self._push("assistant", cached, cancel_id=request_id) is None:
+                return None
+            yield cached
+            return cached
+
+        attempt = 0
+        backoff = RETRY_BASE_WAIT
+        prefer_chat = prefer_chat and self._chat_api
+        parts: List[str] = []
+        completed = False
+        cancelled = False
+        while attempt <= OLLAMA_MAX_RETRIES:
+            try:
+                messages = self._compose_messages(user_prompt)
+                stream = (self._chat_iter if prefer_chat else self._prompt_iter)(messages, max_tokens=max_tokens, timeout=timeout)
+                try:
+                    for chunk in stream:
+                        if request_id is not None and request_id in self._cancelled:
+                            cancelled = True
+                            break
+                        if chunk:
+                            parts.append(chunk)
+                            yield chunk
+                finally:
+                    # closes the HTTP response -> Ollama stops generating
+                    stream.close()
+                completed = not cancelled
+                break
+            except requests.exceptions.RequestException as e:
+                if parts:
+                    # already streamed part of the reply; keep what arrived
+                    logger.warning(f"[ModelBackend] stream interrupted: {e}")
+                    break
+                if prefer_chat and self._chat_unavailable(e):
+                    prefer_chat = False
+                    continue
+                if not _is_retriable(e):
+                    logger.warning(f"[ModelBackend] request rejected: {e}")
+                    break
+                attempt += 1
+                backoff = _next_backoff(backoff)
+                logger.warning(f"[ModelBackend] request error attempt {attempt}: {e} -> waiting {backoff:.1f}s")
+                time.sleep(backoff)
+                if request_id is not None and request_id in self._cancelled:
+                    cancelled = True
+                    break
+            except Exception:
+                logger.exception("[ModelBackend] unexpected error")
+                break
+
+        if cancelled:
+            return None
+        if parts:
+            reply = self._post_process_reply("".join(parts).strip())
+            if completed:
+                self._cache_put(cache_key, reply)
+                self._semantic_put(cache_key, sem_token, reply)
+        elif completed:
+            reply = "[ERRO] Resposta vazia do modelo."
+            yield reply
+        else:
+            reply = self._fallback_message()
+            yield reply
+        # cancel() after the last chunk still wins: the turn is then not recorded
+        if reply and self._push("assistant", reply, cancel_id=request_id) is None:
+            return None
+        return reply
+
+    def cancel(self, request_id: Optional[str]):
+        """
+        Cancela um generate_stream: o stream para no próximo pedaço e o turno do usuário sai
+        do histórico já aqui, antes de um prompt seguinte montar o seu payload.
+        Vale também para um request_id que ainda não começou.
+        """
+        if request_id is None:
+            return
+        with self.lock:
+            if len(self._cancelled) >= 1024:
+                # ids of streams that finished before their cancel arrived never get cleaned up
+                self._cancelled.intersection_update(self._active_requests)
+            self._cancelled.add(request_id)
+            undo = self._active_requests.get(request_id)
+        self._retract(undo)
+
+    def _fallback_message(self) -> str:
+        return (
+            "[ERRO OLLAMA] Max retries exceeded contacting Ollama. Resposta fallback.\n\n"
+            "Verifique se Ollama está rodando e se o modelo foi baixado. "
+            f"Host: {self.host} | Modelo: {self.model_name}\n"
+            "Sugestão: rode `ollama status` e `ollama list` no terminal."
         )
+
+    def initial_assistant_greeting(self) -> str:
+        greeting = INITIAL_GREETING
         try:
             self.push_assistant(greeting)
         except Exception:
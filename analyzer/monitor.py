@@ -1,20 +1,48 @@
 # analyzer/monitor.py
 """
 SystemMonitor - Avançado (B3-capable)
-- Monitora CPU, RAM, Disco e processos
-- Envia eventos para GUI via queue: ('monitor_alert', detail), ('monitor_suggest', detail), ('monitor_action', detail), ('monitor_log', msg)
-- Autonomy control (B1/B2/B3) via analyzer_settings.json
+- Monitora CPU, RAM, Disco e processos (no Linux lendo /proc diretamente; psutil nos demais)
+- Envia eventos para GUI via queue/deque (+ callback notify opcional; sem queue usa um anel deque próprio lido com drain_events()): ('monitor_alert', detail), ('monitor_suggest', detail), ('monitor_action', detail), ('monitor_log', msg)
+- Autonomy control (B1/B2/B3; "off" = a GUI não cria o monitor) via analyzer_settings.json
+- psutil só é importado no primeiro uso
+- get_monitor(): instância única compartilhada (um só loop de coleta; última leitura em latest/last_sample)
+- alertas e sugestões são emitidos na transição de estado, não a cada ciclo
+- heartbeat (monitor_log) a cada 4 ciclos, ou antes se CPU/RAM/disco variar mais de 2 pontos
 """
 
 import os
 import time
-import psutil
 import json
 import logging
 import threading
 import shutil
+import heapq
+import collections
+import re
 import subprocess
-from typing import Optional, Any, Dict, Tuple, List
+from queue import Empty as QueueEmpty
+from concurrent.futures import ThreadPoolExecutor, Future
+import sys
+from typing import Optional, Any, Callable, Dict, Tuple, List, Deque
+
+# Linux: read /proc directly instead of one psutil.Process per PID
+if sys.platform.startswith("linux"):
+    try:
+        import _proc_linux
+    except Exception:
+        _proc_linux = None
+else:
+    _proc_linux = None
+
+# psutil is imported on first use (_psutil()); importing this module stays cheap
+psutil = None
+
+def _psutil():
+    global psutil
+    if psutil is None:
+        import psutil as _p
+        psutil = _p
+    return psutil
 
 logger = logging.getLogger("SystemMonitor")
 if not logger.handlers:
@@ -33,69 +61,312 @@ with open(SETTINGS_PATH, "r", encoding="utf-8") as f:
 DIAG = SETTINGS.get("diagnostic_mode", {})
 AUTONOMY = DIAG.get("autonomy", "B2")
 ALLOW_REPAIRS = DIAG.get("allow_system_repairs", False)
+# readings closer together than this are served from SystemMonitor.last_sample
+MIN_SAMPLE_INTERVAL = 1.0
+DISK_TTL = 60.0
+# the next cycle's process scan starts this many seconds before _check_once
+PREFETCH_LEAD = 0.5
+# heartbeat is logged anyway when cpu/mem/disk moved more than this (percentage points)
+HEARTBEAT_DELTA = 2.0
+# capacity of the monitor's own event ring when no queue is supplied
+EVENT_BUFFER_SIZE = 1024
+PROC_ATTRS = ["pid", "name", "cpu_percent", "memory_percent"]
+PROC_ATTRS_ID = PROC_ATTRS + ["create_time"]
+
+def _proc_score(info: Dict[str,Any]) -> float:
+    return (info.get("cpu_percent") or 0) + (info.get("memory_percent") or 0)
+
+# never auto-killed: substring rule behind the exact-name fast path (SystemMonitor.PROTECTED_NAMES)
+_PROTECTED_RE = re.compile(r"system|svchost|explorer|wininit|python")
+
+# os-specific actions: the platform never changes at runtime, so pick the implementation once
+def _free_mem_posix() -> Dict[str,Any]:
+    # linux: attempt drop caches (requires root)
+    result = {"action": None, "ok": False, "detail": None}
+    try:
+        subprocess.run(["sync"], check=False)
+        # try writing to drop_caches; ignore failure
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+        result["action"] = "drop_caches"
+        result["ok"] = True
+    except Exception as e:
+        result["detail"] = f"drop_caches failed: {e}"
+    return result
+
+def _free_mem_nt() -> Dict[str,Any]:
+    # Windows: attempt small memory heuristics - not destructive
+    return {"action": "windows_noop", "ok": True, "detail": None}
+
+def _free_mem_noop() -> Dict[str,Any]:
+    return {"action": "noop", "ok": False, "detail": None}
+
+def _temp_paths_nt() -> List[str]:
+    return [os.environ.get("TEMP",""), os.path.join(os.path.expanduser("~"), "AppData","Local","Temp")]
+
+def _temp_paths_posix() -> List[str]:
+    return ["/tmp"]
+
+def _repairs_nt() -> List[str]:
+    try:
+        subprocess.run(["sfc", "/scannow"], check=False)
+        return ["sfc /scannow invoked (output in system logs)."]
+    except Exception as e:
+        return [f"sfc error: {e}"]
+
+def _repairs_posix() -> List[str]:
+    return ["no automatic destructive repairs on POSIX."]
+
+_FREE_MEM_IMPL = _free_mem_posix if os.name == "posix" else _free_mem_nt if os.name == "nt" else _free_mem_noop
+_TEMP_PATHS_IMPL = _temp_paths_nt if os.name == "nt" else _temp_paths_posix
+_REPAIRS_IMPL = _repairs_nt if os.name == "nt" else _repairs_posix
 
 class SystemMonitor:
-    def __init__(self, queue=None, interval: float = None):
+    PROTECTED_NAMES = frozenset({
+        "system", "svchost.exe", "explorer.exe", "wininit.exe",
+        "python", "python.exe", "python3", "system idle process",
+    })
+
+    def __init__(self, queue=None, interval: float = None, notify: Optional[Callable[[], None]] = None):
+        # no queue given: own bounded ring (best-effort stream, oldest events drop first)
+        if queue is None:
+            queue = collections.deque(maxlen=EVENT_BUFFER_SIZE)
         self.queue = queue
+        # accepts queue.Queue (put) or collections.deque (append); deque appends need no lock
+        self._put = getattr(queue, "put", None) or getattr(queue, "append", None)
+        # edge-triggered "events available" flag for consumers without a notify hook
+        self.events_ready = threading.Event()
+        # optional wakeup hook called after each event is queued (GUI uses it to drain immediately)
+        self.notify = notify
         self.interval = interval if interval is not None else DIAG.get("auto_scan_interval", 8)
         self.cpu_threshold = DIAG.get("cpu_threshold", 90)
         self.mem_threshold = DIAG.get("mem_threshold", 85)
         self.disk_threshold = DIAG.get("disk_threshold", 92)
-        self._running = False
-        self.action_history: List[Dict[str,Any]] = []
+        self._stop_event = threading.Event()
+        # one background worker prefetching the process list during the loop's wait
+        self._top_exec = ThreadPoolExecutor(max_workers=1, thread_name_prefix="monitor-bg")
+        self._top_future: Optional[Future] = None
+        # serializes process scans (background prefetch vs. inline fallback share the baselines)
+        self._scan_lock = threading.Lock()
+        # last 1000 actions; deque(maxlen) evicts the oldest on append
+        self.action_history: Deque[Dict[str,Any]] = collections.deque(maxlen=1000)
+        # pid -> (psutil.Process, create_time) kept across cycles so per-process cpu_percent
+        # has a baseline; create_time tells a recycled PID apart from the cached process
+        self._proc_cache: Dict[int, Tuple[Any, float]] = {}
+        # Linux /proc path: (pid, starttime) -> cpu ticks at the previous scan
+        self._proc_ticks: Dict[Tuple[int,int], int] = {}
+        self._proc_scan_ts = 0.0
+        # most recent cpu/mem/disk reading (see sample())
+        self.last_sample: Optional[Dict[str, float]] = None
+        self._last_sample_ts = 0.0
+        # system cpu/ram readers picked once: persistent /proc handles on Linux, psutil elsewhere
+        host = None
+        if _proc_linux is not None:
+            try:
+                host = _proc_linux.HostStat()
+            except OSError:
+                host = None
+        if host is not None:
+            self._cpu_percent, self._mem_percent = host.cpu_percent, host.mem_percent
+        else:
+            ps = _psutil()
+            self._cpu_percent = lambda: ps.cpu_percent(interval=None)
+            self._mem_percent = lambda: ps.virtual_memory().percent
+        # latest (cpu, mem, disk, top_procs) published by _check_once
+        self.latest: Tuple[float, float, float, Tuple[Dict[str,Any], ...]] = (0.0, 0.0, 0.0, ())
+        # heartbeat rate limit state (see _check_once)
+        self._tick = 0
+        self._log_every = 4
+        self._last_logged: Tuple[float, float, float] = (0.0, 0.0, 0.0)
+        # threshold state of the previous cycle (alert/suggest events fire on transitions)
+        self._alerting = False
+        self._suggesting = False
+        # (monotonic ts, disk percent) -> see _disk_percent
+        self._disk_cache: Tuple[float, float] = (float("-inf"), 0.0)
 
     def start_monitoring(self):
         logger.info(f"[Monitor] starting monitor (autonomy={AUTONOMY}) interval={self.interval}s")
-        self._running = True
-        time.sleep(0.5)
-        while self._running:
+        # prime the system-wide counter; later calls measure over the sleep interval
+        self._cpu_percent()
+        self._prime_processes()
+        # waits return as soon as stop() is called instead of sleeping out the interval
+        stop = self._stop_event
+        stop.wait(0.5)
+        lead = min(PREFETCH_LEAD, self.interval / 2)
+        while not stop.is_set():
             try:
                 self._check_once()
             except Exception as e:
                 logger.exception(f"[Monitor] loop error: {e}")
                 self._emit("monitor_log", f"monitor loop error: {e}")
-            time.sleep(self.interval)
+            # sleep most of the interval, then start the next cycle's process scan so it
+            # finishes right before _check_once (fresh list, cpu% measured over ~one interval)
+            if stop.wait(self.interval - lead):
+                break
+            try:
+                self._top_future = self._top_exec.submit(self._get_top_processes, 6)
+            except RuntimeError:
+                # executor already shut down by stop()
+                break
+            stop.wait(lead)
 
     def stop(self):
-        self._running = False
+        self._stop_event.set()
+        self._top_exec.shutdown(wait=False, cancel_futures=True)
+
+    def _take_top_processes(self) -> List[Dict[str,Any]]:
+        fut, self._top_future = self._top_future, None
+        if fut is not None:
+            try:
+                return fut.result(timeout=self.interval)
+            except Exception:
+                pass
+        # first cycle (or the background scan failed): collect inline; _scan_lock makes this
+        # wait for a still-running background scan instead of racing it
+        return self._get_top_processes(6)
+
+    def sample(self) -> Dict[str, float]:
+        """Retorna {'cpu','mem','disk'} (%); chamadas mais próximas que MIN_SAMPLE_INTERVAL reaproveitam a última leitura."""
+        now = time.monotonic()
+        last = self.last_sample
+        if last is not None and now - self._last_sample_ts < MIN_SAMPLE_INTERVAL:
+            return last
+        # non-blocking: delta since the previous call (one loop interval), not a 1 s busy sample
+        last = {
+            "cpu": self._cpu_percent(),
+            "mem": self._mem_percent(),
+            "disk": self._disk_percent(now),
+        }
+        self.last_sample, self._last_sample_ts = last, now
+        return last
+
+    def _disk_percent(self, now: float) -> float:
+        # disk usage moves on a scale of minutes: statvfs at most once per DISK_TTL
+        ts, pct = self._disk_cache
+        if now - ts > DISK_TTL:
+            usage = shutil.disk_usage(os.path.expanduser("~"))
+            # same figure as psutil's .percent: used / (used + space available to users)
+            avail = usage.used + usage.free
+            pct = round(100.0 * usage.used / avail, 1) if avail else 0.0
+            self._disk_cache = (now, pct)
+        return pct
+
+    def invalidate_disk(self):
+        """Força nova leitura de disco na próxima amostra (ex.: após limpeza)."""
+        self._disk_cache = (float("-inf"), 0.0)
 
     def _check_once(self):
-        cpu = psutil.cpu_percent(interval=1)
-        mem = psutil.virtual_memory().percent
-        disk = psutil.disk_usage(os.path.expanduser("~")).percent
-        top = self._get_top_processes(6)
+        s = self.sample()
+        cpu, mem, disk = s["cpu"], s["mem"], s["disk"]
+        top = self._take_top_processes()
+        # single reference store: readers unpack monitor.latest without any lock
+        self.latest = (cpu, mem, disk, tuple(top))
 
-        self._emit("monitor_log", f"heartbeat CPU {cpu}% MEM {mem}% DISK {disk}%")
+        # heartbeat only every _log_every cycles or when a reading moved noticeably
+        tick = self._tick
+        self._tick = tick + 1
+        lc, lm, ld = self._last_logged
+        delta = max(abs(cpu - lc), abs(mem - lm), abs(disk - ld))
+        if delta > HEARTBEAT_DELTA or tick % self._log_every == 0:
+            self._last_logged = (cpu, mem, disk)
+            self._emit("monitor_log", f"heartbeat CPU {cpu}% MEM {mem}% DISK {disk}%")
 
-        if cpu >= self.cpu_threshold or mem >= self.mem_threshold or disk >= self.disk_threshold:
+        alerting = cpu >= self.cpu_threshold or mem >= self.mem_threshold or disk >= self.disk_threshold
+        suggesting = not alerting and disk >= (self.disk_threshold - 6)
+        if alerting:
             detail = {"cpu": cpu, "mem": mem, "disk": disk, "top_procs": top}
-            self._emit("monitor_alert", detail)
+            # events only on the rising edge; a sustained condition is visible through latest
+            if not self._alerting:
+                self._emit("monitor_alert", detail)
             # act based on autonomy
             if AUTONOMY == "B3":
                 # automatic mitigation
                 self._mitigate_critical(detail)
         else:
             # suggestions
-            if disk >= (self.disk_threshold - 6):
+            if suggesting and not self._suggesting:
                 self._emit("monitor_suggest", {"suggest": "clean_temp", "disk": disk, "top_procs": top})
             if mem >= (self.mem_threshold - 6) and AUTONOMY == "B3":
                 self._auto_free_memory(top)
+        self._alerting, self._suggesting = alerting, suggesting
 
-    def _get_top_processes(self, n=5):
+    def _prime_processes(self):
+        # first sample only sets the per-process cpu baselines
+        with self._scan_lock:
+            if _proc_linux is not None:
+                self._scan_proc_linux()
+            else:
+                self._sync_proc_cache()
+
+    def _scan_proc_linux(self) -> List[Dict[str,Any]]:
+        now = time.monotonic()
+        elapsed = now - self._proc_scan_ts
+        prev = self._proc_ticks
+        ticks_now: Dict[Tuple[int,int], int] = {}
+        scale = 100.0 / (_proc_linux.CLK_TCK * elapsed) if elapsed > 0 else 0.0
+        mem_scale = 100.0 * _proc_linux.PAGE_SIZE / _proc_linux.TOTAL_MEM
         procs = []
-        for p in psutil.process_iter(attrs=["pid","name","cpu_percent","memory_percent"]):
-            try:
-                info = p.info
-                # ensure cpu_percent populated
-                if info.get("cpu_percent") is None:
-                    info["cpu_percent"] = p.cpu_percent(interval=None)
-                if info.get("memory_percent") is None:
-                    info["memory_percent"] = p.memory_percent()
-                procs.append(info)
-            except Exception:
-                continue
-        procs_sorted = sorted(procs, key=lambda x: (x.get("cpu_percent",0) or 0) + (x.get("memory_percent",0) or 0), reverse=True)
-        return procs_sorted[:n]
+        for pid, name, ticks, start, rss in _proc_linux.collect():
+            # (pid, starttime) so a recycled PID never inherits another process's baseline
+            key = (pid, start)
+            ticks_now[key] = ticks
+            before = prev.get(key)
+            cpu = round((ticks - before) * scale, 1) if before is not None else 0.0
+            procs.append({"pid": pid, "name": name, "cpu_percent": cpu, "memory_percent": rss * mem_scale})
+        self._proc_ticks, self._proc_scan_ts = ticks_now, now
+        return procs
+
+    def _sync_proc_cache(self):
+        # one /proc listing per cycle; Process objects are created (and their cpu counter
+        # primed) only for new PIDs, dead ones are dropped
+        ps = _psutil()
+        cache = self._proc_cache
+        live = set(ps.pids())
+        for pid in cache.keys() - live:
+            del cache[pid]
+        for pid in live - cache.keys():
+            self._cache_process(ps, pid)
+
+    def _cache_process(self, ps, pid: int):
+        try:
+            p = ps.Process(pid)
+            # Process() already resolved create_time for its identity check: cached, no syscall
+            entry = (p, p.create_time())
+            p.cpu_percent(interval=None)
+        except ps.Error:
+            self._proc_cache.pop(pid, None)
+            return
+        self._proc_cache[pid] = entry
+
+    def _get_top_processes(self, n=5):
+        with self._scan_lock:
+            procs = self._collect_processes()
+        # partial selection: O(N log n) for the n we keep instead of sorting every process
+        return heapq.nlargest(n, procs, key=_proc_score)
+
+    def _collect_processes(self) -> List[Dict[str,Any]]:
+        if _proc_linux is not None:
+            procs = self._scan_proc_linux()
+        else:
+            self._sync_proc_cache()
+            ps = _psutil()
+            procs = []
+            for pid, (p, created) in list(self._proc_cache.items()):
+                try:
+                    # as_dict reads every attribute inside one oneshot(); create_time rides along
+                    info = p.as_dict(attrs=PROC_ATTRS_ID, ad_value=0)
+                    # 0 = ad_value (AccessDenied): identity unknown, keep the cached baseline
+                    ct = info.pop("create_time")
+                    if ct and ct != created:
+                        # pid was recycled: start a fresh baseline for the new process
+                        self._cache_process(ps, pid)
+                        continue
+                    procs.append(info)
+                except ps.NoSuchProcess:
+                    self._proc_cache.pop(pid, None)
+                except Exception:
+                    continue
+        return procs
 
     def _mitigate_critical(self, detail: Dict[str,Any]):
         top = detail.get("top_procs", [])
@@ -122,7 +393,8 @@ class SystemMonitor:
             pid = p.get("pid")
             if pid == os.getpid():
                 continue
-            if any(x in name for x in ("system","svchost","explorer","wininit","python")):
+            # exact names hit the set; variants ("python3.11", "systemd") still match by substring
+            if name in self.PROTECTED_NAMES or _PROTECTED_RE.search(name):
                 continue
             ok, msg = self.kill_process(pid)
             self._record_action("kill_auto", {"pid": pid, "ok": ok, "msg": msg})
@@ -134,101 +406,111 @@ class SystemMonitor:
         Termina processo de forma segura. Retorna (ok, mensagem).
         Esta assinatura usa typing.Tuple (correção do erro de hint).
         """
+        ps = _psutil()
         try:
-            p = psutil.Process(pid)
+            p = ps.Process(pid)
             name = p.name()
             p.terminate()
-            gone, alive = psutil.wait_procs([p], timeout=3)
+            gone, alive = ps.wait_procs([p], timeout=3)
             if alive:
                 try:
                     p.kill()
                 except Exception:
                     pass
             return True, f"Processo {name} (PID {pid}) terminado."
-        except psutil.NoSuchProcess:
+        except ps.NoSuchProcess:
             return False, f"Processo {pid} não encontrado."
         except Exception as e:
             return False, f"Falha ao terminar PID {pid}: {e}"
 
     def clean_temp_folder(self, paths: Optional[List[str]] = None) -> Dict[str,Any]:
         if paths is None:
-            if os.name == "nt":
-                paths = [os.environ.get("TEMP",""), os.path.join(os.path.expanduser("~"), "AppData","Local","Temp")]
-            else:
-                paths = ["/tmp"]
+            paths = _TEMP_PATHS_IMPL()
+        # TEMP and ~/AppData/Local/Temp are usually the same folder: clean each real directory once
+        paths = list(dict.fromkeys(os.path.normcase(os.path.realpath(p)) for p in paths if p and os.path.isdir(p)))
         removed = []
         failed = []
         for base in paths:
-            if not base or not os.path.exists(base):
-                continue
             try:
-                for name in os.listdir(base):
-                    fp = os.path.join(base, name)
-                    try:
-                        if os.path.isfile(fp) or os.path.islink(fp):
-                            os.remove(fp)
-                            removed.append(fp)
-                        elif os.path.isdir(fp):
-                            shutil.rmtree(fp, ignore_errors=True)
-                            removed.append(fp)
-                    except Exception as e:
-                        failed.append((fp, str(e)))
+                # scandir entries carry the dirent type: no extra stat() per entry
+                with os.scandir(base) as it:
+                    for entry in it:
+                        fp = entry.path
+                        try:
+                            if entry.is_symlink() or entry.is_file(follow_symlinks=False):
+                                os.remove(fp)
+                                removed.append(fp)
+                            elif entry.is_dir(follow_symlinks=False):
+                                shutil.rmtree(fp, ignore_errors=True)
+                                removed.append(fp)
+                        except Exception as e:
+                            failed.append((fp, str(e)))
             except Exception as e:
                 failed.append((base, str(e)))
+        if removed:
+            self.invalidate_disk()
         return {"removed": removed, "failed": failed}
 
     def free_memory(self) -> Dict[str,Any]:
-        # heuristic: on linux attempt drop caches (requires root) otherwise no-op; on windows call GC hint
-        result = {"action": None, "ok": False, "detail": None}
-        try:
-            if os.name == "posix":
-                try:
-                    subprocess.run(["sync"], check=False)
-                    # try writing to drop_caches; ignore failure
-                    with open("/proc/sys/vm/drop_caches", "w") as f:
-                        f.write("3\n")
-                    result["action"] = "drop_caches"
-                    result["ok"] = True
-                except Exception as e:
-                    result["detail"] = f"drop_caches failed: {e}"
-            elif os.name == "nt":
-                # Windows: attempt small memory heuristics - not destructive
-                result["action"] = "windows_noop"
-                result["ok"] = True
-            else:
-                result["action"] = "noop"
-                result["ok"] = False
-        except Exception as e:
-            result["detail"] = str(e)
-            result["ok"] = False
-        return result
+        return _FREE_MEM_IMPL()
 
     def _maybe_run_repairs(self) -> List[str]:
-        msgs = []
         if not ALLOW_REPAIRS:
-            msgs.append("system repairs disabled.")
-            return msgs
-        try:
-            if os.name == "nt":
-                try:
-                    subprocess.run(["sfc", "/scannow"], check=False)
-                    msgs.append("sfc /scannow invoked (output in system logs).")
-                except Exception as e:
-                    msgs.append(f"sfc error: {e}")
-            else:
-                msgs.append("no automatic destructive repairs on POSIX.")
-        except Exception as e:
-            msgs.append(str(e))
-        return msgs
+            return ["system repairs disabled."]
+        return _REPAIRS_IMPL()
 
     def _emit(self, typ: str, payload: Any):
         try:
-            if self.queue:
-                self.queue.put((typ, payload))
+            if self._put is not None:
+                self._put((typ, payload))
+                self.events_ready.set()
+                if self.notify:
+                    self.notify()
         except Exception:
             logger.exception("failed to emit event")
 
+    def drain_events(self, timeout: Optional[float] = None) -> List[Tuple[str, Any]]:
+        """Espera até timeout s por eventos e devolve todos os pendentes (deque ou queue.Queue)."""
+        if not self.events_ready.wait(timeout):
+            return []
+        self.events_ready.clear()
+        q = self.queue
+        out = []
+        # clear() before popping: an append racing with the drain re-sets the flag
+        get = getattr(q, "get_nowait", None)
+        if get is not None:
+            # queue.Queue (truthiness says nothing about its contents)
+            while True:
+                try:
+                    out.append(get())
+                except QueueEmpty:
+                    break
+            return out
+        while q:
+            try:
+                out.append(q.popleft())
+            except IndexError:
+                break
+        return out
+
     def _record_action(self, name: str, detail: dict):
         self.action_history.append({"ts": time.time(), "action": name, "detail": detail})
-        if len(self.action_history) > 1000:
-            self.action_history = self.action_history[-1000:]
+
+# ---- shared instance ----
+_SINGLETON: Optional[SystemMonitor] = None
+_SINGLETON_LOCK = threading.Lock()
+
+def get_monitor(queue=None, interval: float = None, notify: Optional[Callable[[], None]] = None) -> SystemMonitor:
+    """
+    Retorna o SystemMonitor compartilhado, criando e iniciando (thread daemon) na primeira chamada.
+    Chamadas seguintes reaproveitam o mesmo loop de coleta; queue/interval/notify só valem na criação.
+    Depois de stop() a instância não reinicia: a próxima chamada cria e inicia uma nova.
+    """
+    global _SINGLETON
+    with _SINGLETON_LOCK:
+        if _SINGLETON is None or _SINGLETON._stop_event.is_set():
+            mon = SystemMonitor(queue=queue, interval=interval, notify=notify)
+            threading.Thread(target=mon.start_monitoring, name="SystemMonitor", daemon=True).start()
+            _SINGLETON = mon
+        return _SINGLETON
+
@@ -1,11 +1,31 @@
 # analyzer/utils.py
+import os
 import threading
+from concurrent.futures import ThreadPoolExecutor, Future
 
-def run_in_thread(fn, daemon: bool = True):
+# shared bounded pool: short background jobs reuse workers instead of spawning a thread each
+_POOL = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 4) * 2), thread_name_prefix="analyzer")
+
+def run_in_thread(fn, *args, **kwargs) -> Future:
+    """
+    Executa fn(*args, **kwargs) em segundo plano no pool compartilhado.
+    Retorna o Future. Loops longos (ex.: SystemMonitor) devem ter thread própria,
+    pois os workers do pool são aguardados na saída do interpretador.
+    """
+    return _POOL.submit(fn, *args, **kwargs)
+
+def run_daemon(fn, *args, **kwargs) -> Future:
     """
-    Executa função fn em thread separada e inicia imediatamente.
-    Retorna objeto Thread.
+    Executa fn numa thread daemon própria e retorna um Future com o resultado.
+    Para chamadas que podem ficar presas na rede (warmup, geração): não seguram a saída do processo.
     """
-    t = threading.Thread(target=fn, daemon=daemon)
-    t.start()
-    return t
+    fut: Future = Future()
+    def _run():
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            fut.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            fut.set_exception(e)
+    threading.Thread(target=_run, name=getattr(fn, "__name__", "daemon"), daemon=True).start()
+    return fut